@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Analysis cache - Memoizes per-message analysis by content hash
+
+Results (category, confidence, tasks, events) are keyed on a hash of the
+subject, the analyzed body text and the analyzer version, so a message that
+comes back unchanged on the next refresh - in any mailbox, with or without
+the message store - is never re-analyzed. Lookups go through an in-memory
+LRU first and an optional SQLite file second.
+
+The analyzer version is a fingerprint of the active keyword table and the
+source of the analysis modules, so editing a rule, a keyword config or the
+extraction code invalidates every cached result automatically; rows from
+older versions are purged when the cache is opened.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import batch_classify
+import categorizer as categorizer_module
+import task_extractor
+from categorizer import get_categorizer
+
+ANALYSIS_CACHE_PATH = '/root/.openclaw/workspace/email-dashboard/.analysis_cache.db'
+
+DEFAULT_MEMORY_ENTRIES = 5000
+DEFAULT_DISK_ENTRIES = 50000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS analysis (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analysis_last_used ON analysis (last_used);
+'''
+
+
+def analyzer_version(categorizer=None):
+    """Fingerprint of everything that determines analysis output"""
+    categorizer = categorizer or get_categorizer()
+    digest = hashlib.sha256(json.dumps(categorizer.keyword_table, sort_keys=True).encode())
+    for module in (categorizer_module, task_extractor, batch_classify):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """In-memory LRU of analysis results, optionally backed by SQLite; safe to share between threads"""
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_entries=DEFAULT_MEMORY_ENTRIES, version=None):
+        self.version = version or analyzer_version()
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self.conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute('DELETE FROM analysis WHERE version != ?', (self.version,))
+            self.conn.commit()
+
+    def key(self, subject, body):
+        """Content hash of one message under the current analyzer version"""
+        return hashlib.sha256(f"{self.version}\0{subject}\0{body}".encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return {key: result} for the cached subset of `keys`"""
+        with self.lock:
+            found = {}
+            missing = []
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                else:
+                    missing.append(key)
+            if missing and self.conn is not None:
+                from_disk = []
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = self.conn.execute(
+                        f'SELECT key, result FROM analysis WHERE key IN ({placeholders})', chunk
+                    )
+                    for key, result in rows:
+                        found[key] = json.loads(result)
+                        self._remember(key, found[key])
+                        from_disk.append(key)
+                if from_disk:
+                    now = time.time()
+                    self.conn.executemany('UPDATE analysis SET last_used = ? WHERE key = ?',
+                                          [(now, key) for key in from_disk])
+                    self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            return found
+
+    def put_many(self, results):
+        """Cache {key: result}"""
+        with self.lock:
+            for key, result in results.items():
+                self._remember(key, result)
+            if self.conn is not None and results:
+                now = time.time()
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?)',
+                    [(key, self.version, json.dumps(result), now) for key, result in results.items()],
+                )
+                self.conn.commit()
+
+    def evict(self, max_count=DEFAULT_DISK_ENTRIES):
+        """Keep at most `max_count` of the most recently used rows on disk"""
+        with self.lock:
+            if self.conn is None:
+                return 0
+            removed = self.conn.execute(
+                'DELETE FROM analysis WHERE key NOT IN (SELECT key FROM analysis ORDER BY last_used DESC LIMIT ?)',
+                (max_count,),
+            ).rowcount
+            self.conn.commit()
+            return removed
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
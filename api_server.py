@@ -4,205 +4,215 @@ Email Dashboard API Server
 Fetches real Gmail data and serves it to the dashboard
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import json
-import imaplib
-import email
-from email.header import decode_header
-from datetime import datetime, timedelta
-import re
 import threading
 import time
+from urllib.parse import urlparse, parse_qs
 
-# Cache for email data
+from mail_fetch import idle_wait, noop_wait
+from mail_sources import open_source
+from analysis_cache import AnalysisCache
+from rolling_aggregates import RollingAggregates
+from time_index import TimeIndex
+from pipeline import (PipelineStats, get_mailbox_configs, read_source, fetch_all_mailboxes, sort_by_date,
+                      dedupe_emails, build_dashboard_data, serialize_dashboard)
+
+# Cache for email data; 'live' is set while every mailbox has a connected watcher
+# 'payload' is the serialized data, so requests never re-encode it;
+# 'index' is a TimeIndex over the cached emails for /api/emails queries
 email_cache = {
     'data': None,
-    'last_update': 0
+    'payload': None,
+    'index': TimeIndex(),
+    'last_update': 0,
+    'live': False
 }
+# Stage timings accumulated over every refresh since startup
+pipeline_stats = PipelineStats()
+# Last-hour/last-7-days counters, fed by every refresh
+rolling_aggregates = RollingAggregates()
+# Every refresh re-reads the newest messages; unchanged ones reuse their analysis
+# (opened by run_server)
+analysis_cache = None
+cache_lock = threading.Lock()
+# Newest emails of each watched mailbox by label, and the labels whose watcher is connected
+mailbox_emails = {}
+live_mailboxes = set()
+# Serializes rebuilds, which feed the shared rolling aggregates
+refresh_lock = threading.Lock()
 
-def get_email_config():
-    """Read email credentials from config"""
-    config_path = '/root/.openclaw/workspace/.email_config'
-    with open(config_path, 'r') as f:
-        lines = f.readlines()
-        email_addr = None
-        app_pass = None
-        for line in lines:
-            if 'address' in line:
-                email_addr = line.split('=')[1].strip().strip('"')
-            if 'app_password' in line:
-                app_pass = line.split('=')[1].strip().strip('"')
-        return email_addr, app_pass
+# Named windows accepted by /api/emails?window=
+TIME_WINDOWS = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}
 
-def extract_tasks(body):
-    """Extract potential tasks from email body"""
-    tasks = []
-    task_patterns = [
-        r'(?:please|kindly|need to|should|must|todo|to-do|action item|follow up|deadline)[\s:]*([^\.\n]+)',
-        r'\b(due by|due on|deadline|complete by|finish by)[\s:]*([^\.\n]+)',
-        r'\b(meeting|call|schedule|appointment)[\s:]*([^\.\n]+)',
-    ]
-    for pattern in task_patterns:
-        matches = re.findall(pattern, body, re.IGNORECASE)
-        for match in matches:
-            if isinstance(match, tuple):
-                task = ' '.join(match).strip()
-            else:
-                task = match.strip()
-            if task and len(task) > 10 and len(task) < 200:
-                tasks.append(task)
-    return list(set(tasks))[:5]
+# Seconds before cached data is refreshed without a change notification
+CACHE_TTL = 300
+# Poll interval when the server does not support IDLE
+NOOP_INTERVAL = 60
+MAX_RECONNECT_DELAY = 300
 
-def extract_events(body, subject):
-    """Extract potential events/meetings"""
-    events = []
-    meeting_keywords = ['meeting', 'call', 'zoom', 'teams', 'google meet', 'webinar', 'conference', 'appointment']
-    text = subject + ' ' + body
-    for keyword in meeting_keywords:
-        if keyword.lower() in text.lower():
-            events.append({'type': keyword, 'details': 'Detected in email'})
-    return events[:3]
+def update_cache(emails):
+    """Rebuild and serialize the cached dashboard data from a fresh list of emails"""
+    with refresh_lock:
+        data = build_dashboard_data(emails, pipeline_stats, rolling_aggregates)
+        payload = serialize_dashboard(data, pipeline_stats, indent=None)
+        index = TimeIndex(data['emails'])
+        with cache_lock:
+            email_cache['data'] = data
+            email_cache['payload'] = payload
+            email_cache['index'] = index
+            email_cache['last_update'] = time.time()
+    return data
 
-def categorize_email(subject, body):
-    """Categorize email by type"""
-    subject_lower = subject.lower()
-    body_lower = body.lower()
-    categories = {
-        'work': ['work', 'project', 'deadline', 'meeting', 'report', 'client', 'boss', 'manager'],
-        'personal': ['personal', 'family', 'friend', 'birthday', 'invitation'],
-        'finance': ['bank', 'payment', 'invoice', 'bill', 'transaction', 'money', 'salary'],
-        'shopping': ['order', 'delivery', 'amazon', 'flipkart', 'shipped', 'tracking'],
-        'newsletter': ['newsletter', 'subscription', 'unsubscribe', 'digest', 'update'],
-        'social': ['linkedin', 'facebook', 'twitter', 'instagram', 'notification'],
-    }
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword in subject_lower or keyword in body_lower:
-                return category
-    return 'other'
+def update_mailbox(label, emails, labels, limit=20):
+    """Replace one watched mailbox's emails and rebuild the cache from every mailbox, merged like data.json
+    
+    Nothing is rebuilt until each of `labels` has been read once, so the
+    cache never holds a partial merge. Mailboxes are merged in `labels`
+    order, so a message in several of them keeps its first mailbox.
+    """
+    with cache_lock:
+        mailbox_emails[label] = emails
+        if not all(name in mailbox_emails for name in labels):
+            return None
+        merged = [e for name in labels for e in mailbox_emails[name]]
+    return update_cache(sort_by_date(dedupe_emails(merged))[:limit])
 
-def fetch_emails(limit=20):
-    """Fetch emails from Gmail"""
-    try:
-        email_addr, app_pass = get_email_config()
-        mail = imaplib.IMAP4_SSL('imap.gmail.com', 993)
-        mail.login(email_addr, app_pass)
-        mail.select('inbox')
-        
-        date = (datetime.now() - timedelta(days=7)).strftime('%d-%b-%Y')
-        status, messages = mail.search(None, f'(SINCE "{date}")')
-        
-        emails = []
-        if status == 'OK' and messages[0]:
-            email_ids = messages[0].split()[-limit:]
-            
-            for email_id in reversed(email_ids):
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
-                if status != 'OK':
-                    continue
-                
-                raw_email = msg_data[0][1]
-                msg = email.message_from_bytes(raw_email)
-                
-                subject = ""
-                if msg['Subject']:
-                    decoded = decode_header(msg['Subject'])
-                    for part, charset in decoded:
-                        if isinstance(part, bytes):
-                            subject += part.decode(charset or 'utf-8', errors='ignore')
-                        else:
-                            subject += part
-                
-                from_addr = msg['From'] or "Unknown"
-                date_str = msg['Date'] or "Unknown"
-                
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        content_type = part.get_content_type()
-                        if content_type == "text/plain":
-                            try:
-                                body = part.get_payload(decode=True).decode('utf-8', errors='ignore')[:1000]
-                                break
-                            except:
-                                pass
-                else:
-                    try:
-                        body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')[:1000]
-                    except:
-                        pass
-                
-                category = categorize_email(subject, body)
-                tasks = extract_tasks(body)
-                events = extract_events(body, subject)
-                
-                # Clean up sender name
-                sender_name = from_addr.split('<')[0].strip() if '<' in from_addr else from_addr
-                if len(sender_name) > 30:
-                    sender_name = sender_name[:27] + '...'
-                
-                emails.append({
-                    'id': email_id.decode(),
-                    'subject': subject[:80] + ('...' if len(subject) > 80 else ''),
-                    'from': sender_name,
-                    'date': date_str,
-                    'category': category,
-                    'tasks': tasks,
-                    'events': events,
-                    'preview': body[:150].replace('\n', ' ').strip() + '...' if body else ''
-                })
-        
-        mail.logout()
-        return emails
-    except Exception as e:
-        print(f"Error fetching emails: {e}")
-        return []
+def set_live(label, live, expected):
+    """Mark one watcher (dis)connected; the cache is live once all `expected` mailboxes are"""
+    with cache_lock:
+        if live:
+            live_mailboxes.add(label)
+        else:
+            live_mailboxes.discard(label)
+        email_cache['live'] = live_mailboxes.issuperset(expected)
 
-def get_dashboard_data():
-    """Get dashboard data with caching"""
-    global email_cache
-    current_time = time.time()
+def get_dashboard_payload():
+    """Get serialized dashboard data with caching
     
-    # Refresh cache if older than 5 minutes
-    if email_cache['data'] is None or (current_time - email_cache['last_update']) > 300:
+    While the mailbox watchers hold live sessions the cache is kept current
+    by push, so requests never touch IMAP. Otherwise fall back to fetching
+    every mailbox inside the request when the cache is older than CACHE_TTL.
+    """
+    with cache_lock:
+        payload = email_cache['payload']
+        stale = payload is None or (
+            not email_cache['live'] and (time.time() - email_cache['last_update']) > CACHE_TTL
+        )
+    if stale:
         print("Fetching fresh email data...")
-        emails = fetch_emails(20)
-        
-        categories = {}
-        all_tasks = []
-        all_events = []
-        
-        for e in emails:
-            cat = e['category']
-            categories[cat] = categories.get(cat, 0) + 1
-            all_tasks.extend(e['tasks'])
-            all_events.extend(e['events'])
-        
-        email_cache['data'] = {
-            'summary': {
-                'total_emails': len(emails),
-                'categories': categories,
-                'task_count': len(all_tasks),
-                'event_count': len(all_events)
-            },
-            'emails': emails,
-            'tasks': list(set(all_tasks))[:10],
-            'events': all_events
-        }
-        email_cache['last_update'] = current_time
+        update_cache(fetch_all_mailboxes(20, stats=pipeline_stats, cache=analysis_cache))
+        with cache_lock:
+            payload = email_cache['payload']
+    return payload
+
+def query_emails(query):
+    """Cached emails in a time window, newest first
+    
+    Accepts since=<epoch seconds> or window=hour|day|week|today; the window
+    is found by binary search over the timestamp index.
+    """
+    get_dashboard_payload()
+    with cache_lock:
+        index = email_cache['index']
+    if 'since' in query:
+        return index.since(int(query['since'][0]))
+    window = query.get('window', ['day'])[0]
+    if window == 'today':
+        return index.today()
+    return index.last(TIME_WINDOWS[window])
+
+class MailboxWatcher(threading.Thread):
+    """Background thread holding a long-lived IMAP session to one mailbox
+    
+    Waits for new mail with IDLE (or NOOP polling when the server lacks
+    IDLE), re-reads its mailbox whenever it changes or the cache ages past
+    CACHE_TTL, and reconnects with backoff when the session drops. `labels`
+    lists every watched mailbox in config order, so the cache only counts as live
+    while all of them are connected.
+    """
+    
+    def __init__(self, mailbox, labels, limit=20):
+        super().__init__(name=f"mailbox-watcher {mailbox['label']}", daemon=True)
+        self.mailbox = mailbox
+        self.labels = labels
+        self.limit = limit
+        self.stop_event = threading.Event()
+        self.source = None
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def run(self):
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                self.source = open_source(self.mailbox)
+                failures = 0
+                self.watch()
+            except Exception as e:
+                failures += 1
+                print(f"Mailbox watcher for {self.mailbox['label']} disconnected: {e}")
+            finally:
+                set_live(self.mailbox['label'], False, self.labels)
+                self.close()
+            if not self.stop_event.is_set():
+                self.stop_event.wait(min(2 ** failures, MAX_RECONNECT_DELAY))
     
-    return email_cache['data']
+    def watch(self):
+        mail = self.source.mail
+        supports_idle = 'IDLE' in mail.capabilities
+        changed = True
+        while not self.stop_event.is_set():
+            if changed or time.time() - email_cache['last_update'] > CACHE_TTL:
+                label = self.mailbox['label']
+                update_mailbox(label, read_source(self.source, label, self.limit,
+                                                  stats=pipeline_stats, cache=analysis_cache),
+                               self.labels, self.limit)
+                set_live(label, True, self.labels)
+            if supports_idle:
+                changed = idle_wait(mail, CACHE_TTL, self.stop_event)
+            else:
+                changed = noop_wait(mail, NOOP_INTERVAL, self.stop_event)
+    
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
 
 class DashboardHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        if self.path == '/api/dashboard':
+        url = urlparse(self.path)
+        if url.path == '/api/dashboard':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            
+            self.wfile.write(get_dashboard_payload())
+        elif url.path == '/api/emails':
+            try:
+                emails = query_emails(parse_qs(url.query))
+            except (KeyError, ValueError):
+                self.send_response(400)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            
+            self.wfile.write(json.dumps({'count': len(emails), 'emails': emails}).encode())
+        elif url.path == '/api/stats':
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            data = get_dashboard_data()
-            self.wfile.write(json.dumps(data).encode())
+            stats = dict(pipeline_stats.as_dict(), metrics=pipeline_stats.metrics_dict())
+            if analysis_cache is not None:
+                stats['analysis_cache'] = {'hits': analysis_cache.hits, 'misses': analysis_cache.misses}
+            self.wfile.write(json.dumps(stats).encode())
         else:
             self.send_response(404)
             self.end_headers()
@@ -211,8 +221,17 @@ class DashboardHandler(BaseHTTPRequestHandler):
         # Suppress logs
         pass
 
-def run_server(port=8000):
-    server = HTTPServer(('0.0.0.0', port), DashboardHandler)
+def run_server(port=8000, watch=True):
+    global analysis_cache
+    analysis_cache = AnalysisCache()
+    # Push updates need a server session per mailbox; with any local maildir/mbox
+    # source configured, every mailbox is read on demand instead
+    mailboxes = get_mailbox_configs()
+    if watch and all(mailbox['type'] == 'imap' for mailbox in mailboxes):
+        labels = [mailbox['label'] for mailbox in mailboxes]
+        for mailbox in mailboxes:
+            MailboxWatcher(mailbox, labels).start()
+    server = ThreadingHTTPServer(('0.0.0.0', port), DashboardHandler)
     print(f"Email Dashboard API running on port {port}")
     server.serve_forever()
 
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Atomic file writes - Replace a file so readers see the old or new contents, never a mix
+
+The payload goes to a uniquely named temporary file in the target's
+directory, is flushed and fsynced, and is then renamed over the target.
+Concurrent writers each get their own temporary file (the last rename
+wins), and a crash or power loss leaves either the previous file or the
+complete new one.
+"""
+
+import os
+import tempfile
+
+
+def atomic_write(path, payload):
+    """Write bytes to path via a fsynced temporary file and os.replace"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600; keep the mode the target already had
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    # Persist the rename itself
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
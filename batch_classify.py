@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Batch classification - Category scores and event hits for a whole fetch at once
+
+Messages are split into whitespace-separated terms and turned into sparse
+message x term matrices. Every distinct term is matched against the
+keyword automaton only once, giving a term x keyword matrix; a sparse
+product then yields keyword hits for every message, and category scores
+are one dense product away. On large backfills the vocabulary grows far
+slower than the message count, so the per-character Python work is paid
+once per distinct term instead of once per message.
+
+A keyword without whitespace can only occur inside a single term, so this
+matches exactly what the per-message scan finds. The few keywords that do
+contain whitespace ('google meet') are checked with a plain substring test.
+
+NumPy and SciPy are optional: without them (or for small batches, where
+the setup cost dominates) classify_batch falls back to per-message
+categorize/extract_events with identical results.
+"""
+
+from collections import defaultdict
+from itertools import count
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional dependency
+    np = None
+    sparse = None
+
+from categorizer import MEETING_KEYWORDS, SUBJECT_WEIGHT, AhoCorasick, extract_events, get_categorizer
+
+# Below this many messages the per-message path is faster
+MIN_BATCH_SIZE = 200
+
+
+def _term_matrix(texts, vocab):
+    """Sparse 0/1 message x term matrix; `vocab` is a term -> id defaultdict that grows as needed"""
+    rows = [set(text.split()) for text in texts]
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    cols = np.fromiter(map(vocab.__getitem__, (term for terms in rows for term in terms)),
+                       dtype=np.int64, count=int(lengths.sum()))
+    return np.repeat(np.arange(len(rows)), lengths), cols
+
+
+def _keyword_matrix(vocab, automaton, keyword_ids):
+    """Sparse 0/1 matrix mapping each vocabulary term to the keywords it contains"""
+    rows, cols = [], []
+    for term, term_id in vocab.items():
+        for keyword in {keyword for _, keyword in automaton.find_all(term)}:
+            rows.append(term_id)
+            cols.append(keyword_ids[keyword])
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                             shape=(len(vocab), len(keyword_ids)))
+
+
+def classify_batch(items, categorizer=None, min_batch_size=MIN_BATCH_SIZE):
+    """Classify [(subject, body)] pairs; returns [(category, confidence, events)] in order"""
+    categorizer = categorizer or get_categorizer()
+    if np is None or len(items) < min_batch_size:
+        return [categorizer.categorize(subject, body) + (extract_events(body, subject),)
+                for subject, body in items]
+
+    keywords = list(dict.fromkeys(list(categorizer.keyword_categories) + MEETING_KEYWORDS))
+    keyword_ids = {keyword: i for i, keyword in enumerate(keywords)}
+    single = [keyword for keyword in keywords if len(keyword.split()) == 1 and keyword.strip() == keyword]
+    spaced = [keyword for keyword in keywords if keyword not in single]
+    automaton = AhoCorasick(single)
+
+    subjects = [subject.lower() for subject, _ in items]
+    bodies = [body.lower() for _, body in items]
+    vocab = defaultdict(count().__next__)
+    subject_cells = _term_matrix(subjects, vocab)
+    body_cells = _term_matrix(bodies, vocab)
+    to_keywords = _keyword_matrix(vocab, automaton, keyword_ids)
+
+    def keyword_hits(cells, texts):
+        rows, cols = cells
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                   shape=(len(items), len(vocab)))
+        hits = (matrix @ to_keywords).toarray() > 0
+        for keyword in spaced:
+            hits[:, keyword_ids[keyword]] = [keyword in text for text in texts]
+        return hits
+
+    subject_hits = keyword_hits(subject_cells, subjects)
+    body_hits = keyword_hits(body_cells, bodies)
+
+    # Keyword weight per message: SUBJECT_WEIGHT if in the subject, else 1 if in the body
+    weights = np.where(subject_hits, SUBJECT_WEIGHT, body_hits.astype(np.int32))
+
+    category_matrix = np.zeros((len(keywords), len(categorizer.order)), dtype=np.int32)
+    for keyword, categories in categorizer.keyword_categories.items():
+        for category in categories:
+            category_matrix[keyword_ids[keyword], categorizer.order.index(category)] = 1
+    scores = weights @ category_matrix
+    totals = scores.sum(axis=1)
+    best = scores.argmax(axis=1)  # first maximum, so table order breaks ties
+
+    # Events scan subject + ' ' + body, so a spaced keyword may straddle the two
+    event_hits = (subject_hits | body_hits)[:, [keyword_ids[keyword] for keyword in MEETING_KEYWORDS]]
+    for column, keyword in enumerate(MEETING_KEYWORDS):
+        if keyword in spaced:
+            event_hits[:, column] = [keyword in s + ' ' + b for s, b in zip(subjects, bodies)]
+
+    results = []
+    for i in range(len(items)):
+        if totals[i]:
+            category = categorizer.order[best[i]]
+            confidence = round(float(scores[i, best[i]]) / float(totals[i]), 2)
+        else:
+            category, confidence = 'other', 0.0
+        events = [{'type': keyword, 'details': 'Detected in email'}
+                  for keyword, hit in zip(MEETING_KEYWORDS, event_hits[i]) if hit][:3]
+        results.append((category, confidence, events))
+    return results
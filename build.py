@@ -1,35 +1,82 @@
 #!/usr/bin/env python3
 """
 Build script - Fetches emails, generates AI summaries and executive briefing, and builds static dashboard
-"""
-
-import subprocess
 
-# Run the update script to fetch emails
-print("Fetching emails...")
-subprocess.run(['python3', 'update_dashboard.py'])
-
-# Generate AI summaries for each email
-print("\nGenerating AI summaries...")
-subprocess.run(['python3', 'summarize.py'])
+All stages run in this one process and hand the same data dict along, so
+nothing is re-read from disk between them. data.json and index.html are
+written once, atomically, at the end: a crash partway through leaves the
+previous build in place, and the sync state only advances after the new
+data is on disk. Per-stage timings are printed at the end.
+"""
 
-# Generate executive briefing
-print("\nGenerating executive briefing...")
-subprocess.run(['python3', 'executive_briefing.py'])
+import argparse
+import time
+from contextlib import contextmanager
 
-# Read the data
-with open('data.json', 'r') as f:
-    data = f.read()
+from atomic_io import atomic_write
+from pipeline import DATA_PATH, DEFAULT_FETCH_WORKERS, PipelineStats, serialize_dashboard
+from update_dashboard import collect_dashboard
+from summarize import add_summaries
+from executive_briefing import BriefingEngine, kimi_backend, add_briefing
 
-# Read the template
-with open('index_template.html', 'r') as f:
-    template = f.read()
+TEMPLATE_PATH = 'index_template.html'
+OUTPUT_PATH = 'index.html'
 
-# Replace placeholder with data
-html = template.replace('DATA_PLACEHOLDER', data)
+@contextmanager
+def stage(name, timings):
+    """Time a build stage into timings as (name, seconds)"""
+    print(f"\n{name}...")
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, time.perf_counter() - start))
 
-# Write the final HTML
-with open('index.html', 'w') as f:
-    f.write(html)
+def build(incremental=False, fetch_workers=DEFAULT_FETCH_WORKERS, llm_briefing=False):
+    """Run every stage in-process and write data.json and index.html; returns the dashboard data"""
+    stats = PipelineStats()
+    timings = []
+    
+    # Run the update stages to fetch emails
+    with stage("Fetching emails", timings):
+        data, save_state = collect_dashboard(incremental=incremental, fetch_workers=fetch_workers, stats=stats)
+    
+    # Generate AI summaries for each email
+    with stage("Generating AI summaries", timings):
+        add_summaries(data)
+    
+    # Generate executive briefing
+    with stage("Generating executive briefing", timings):
+        add_briefing(data, BriefingEngine(kimi_backend() if llm_briefing else None))
+    
+    # Replace placeholder with data
+    with stage("Rendering dashboard", timings):
+        payload = serialize_dashboard(data, stats)
+        with open(TEMPLATE_PATH, 'r') as f:
+            template = f.read()
+        html = template.replace('DATA_PLACEHOLDER', payload.decode())
+    
+    # Write the outputs, then let the next incremental run start after this one
+    with stage("Writing output", timings):
+        atomic_write(DATA_PATH, payload)
+        atomic_write(OUTPUT_PATH, html.encode())
+        save_state()
+    
+    print(f"\nPipeline stages:\n{stats.report()}")
+    print("Build stages:")
+    for name, seconds in timings:
+        print(f"  {name:<32} {seconds:8.3f}s")
+    print(f"  {'total':<32} {sum(seconds for _, seconds in timings):8.3f}s")
+    return data
 
-print("\nDashboard built successfully!")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fetch, summarize and render the static dashboard")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch mail above the last synced UID and merge it into data.json")
+    parser.add_argument('--fetch-workers', type=int, default=DEFAULT_FETCH_WORKERS,
+                        help="maximum concurrent IMAP connections across accounts/folders")
+    parser.add_argument('--llm-briefing', action='store_true',
+                        help="write the executive briefing with the Kimi API (templates if it fails)")
+    args = parser.parse_args()
+    build(args.incremental, args.fetch_workers, args.llm_briefing)
+    print("\nDashboard built successfully!")
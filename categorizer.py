@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Email categorizer - Aho-Corasick keyword matching with per-category scoring
+
+The keyword table is compiled once into an automaton, which finds every
+keyword occurrence in a single pass over subject + body regardless of how
+many keywords there are. Each category is scored from its matched
+keywords (subject hits count double) and the best one is returned along
+with a confidence in [0, 1]. Meeting/event keyword detection lives here
+too since it is the same kind of keyword scan.
+"""
+
+import json
+import os
+from collections import deque
+
+CATEGORIES_CONFIG_PATH = os.environ.get('EMAIL_DASHBOARD_CATEGORIES',
+                                        '/root/.openclaw/workspace/.email_categories.json')
+
+# Order matters: it breaks ties between equally scored categories
+DEFAULT_CATEGORY_KEYWORDS = {
+    'work': ['work', 'project', 'deadline', 'meeting', 'report', 'client', 'boss', 'manager'],
+    'personal': ['personal', 'family', 'friend', 'birthday', 'invitation'],
+    'finance': ['bank', 'payment', 'invoice', 'bill', 'transaction', 'money', 'salary'],
+    'shopping': ['order', 'delivery', 'amazon', 'flipkart', 'shipped', 'tracking'],
+    'newsletter': ['newsletter', 'subscription', 'unsubscribe', 'digest', 'update'],
+    'social': ['linkedin', 'facebook', 'twitter', 'instagram', 'notification'],
+}
+
+SUBJECT_WEIGHT = 2
+
+MEETING_KEYWORDS = ['meeting', 'call', 'zoom', 'teams', 'google meet', 'webinar', 'conference', 'appointment']
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher compiled to a DFA over the keyword alphabet"""
+
+    def __init__(self, keywords):
+        self.transitions = [{}]
+        self.outputs = [()]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self.transitions[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.transitions)
+                    self.transitions[state][ch] = nxt
+                    self.transitions.append({})
+                    self.outputs.append(())
+                state = nxt
+            if keyword not in self.outputs[state]:
+                self.outputs[state] += (keyword,)
+
+        # Breadth-first pass: set failure links, inherit outputs along them
+        # and fill in every missing transition so scanning is one dict lookup
+        # per character
+        fail = [0] * len(self.transitions)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in list(self.transitions[state].items()):
+                if state:
+                    fail[nxt] = self.transitions[fail[state]].get(ch, 0)
+                    self.outputs[nxt] += self.outputs[fail[nxt]]
+                queue.append(nxt)
+            if state:
+                for ch, target in self.transitions[fail[state]].items():
+                    self.transitions[state].setdefault(ch, target)
+
+    def find_all(self, text):
+        """Yield (end_index, keyword) for every keyword occurrence in `text`"""
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        for i, ch in enumerate(text):
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                for keyword in outputs[state]:
+                    yield i, keyword
+
+
+class Categorizer:
+    """Scores emails against a {category: [keywords]} table"""
+
+    def __init__(self, keyword_table=None):
+        self.keyword_table = {category: [k.lower() for k in keywords]
+                              for category, keywords in (keyword_table or DEFAULT_CATEGORY_KEYWORDS).items()}
+        self.order = list(self.keyword_table)
+        self.keyword_categories = {}
+        for category, keywords in self.keyword_table.items():
+            for keyword in keywords:
+                self.keyword_categories.setdefault(keyword, []).append(category)
+        self.automaton = AhoCorasick(self.keyword_categories)
+
+    def scores(self, subject, body):
+        """Return {category: score}; each distinct keyword counts once, double if it is in the subject"""
+        subject = subject.lower()
+        text = subject + '\n' + body.lower()
+        weights = {}
+        for end, keyword in self.automaton.find_all(text):
+            weight = SUBJECT_WEIGHT if end < len(subject) else 1
+            if weight > weights.get(keyword, 0):
+                weights[keyword] = weight
+        scores = {}
+        for keyword, weight in weights.items():
+            for category in self.keyword_categories[keyword]:
+                scores[category] = scores.get(category, 0) + weight
+        return scores
+
+    def categorize(self, subject, body):
+        """Return (category, confidence); ('other', 0.0) when no keyword matches"""
+        scores = self.scores(subject, body)
+        if not scores:
+            return 'other', 0.0
+        # max() keeps the first of equal scores, so table order breaks ties
+        best = max(self.order, key=lambda category: scores.get(category, 0))
+        return best, round(scores[best] / sum(scores.values()), 2)
+
+
+def load_keyword_table(path=CATEGORIES_CONFIG_PATH):
+    """Read a {category: [keywords]} table from JSON, or the built-in table if there is none"""
+    try:
+        with open(path, 'r') as f:
+            table = json.load(f)
+        if isinstance(table, dict) and table:
+            return table
+    except (OSError, ValueError):
+        pass
+    return DEFAULT_CATEGORY_KEYWORDS
+
+
+_default_categorizer = None
+
+
+def get_categorizer():
+    """Return the shared categorizer, building it from config on first use"""
+    global _default_categorizer
+    if _default_categorizer is None:
+        _default_categorizer = Categorizer(load_keyword_table())
+    return _default_categorizer
+
+
+def categorize_email(subject, body):
+    """Categorize email by type"""
+    return get_categorizer().categorize(subject, body)[0]
+
+
+def extract_events(body, subject):
+    """Extract potential events/meetings"""
+    events = []
+    text = (subject + ' ' + body).lower()
+    for keyword in MEETING_KEYWORDS:
+        if keyword in text:
+            events.append({'type': keyword, 'details': 'Detected in email'})
+    return events[:3]
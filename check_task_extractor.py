@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Task extractor golden check - Compares extract_tasks with the original implementation
+
+task_extractor.extract_tasks must return exactly what the original
+sentence-by-sentence regex chain did. This script keeps that original as
+reference_extract_tasks and runs both over a reproducible corpus: the
+previews in data.json (if present), the bodies of synthetic messages from
+the local IMAP stand-in, and seeded random sentences assembled from the
+patterns' own trigger words. Run it after any change to the patterns:
+
+    python3 check_task_extractor.py --fuzz 60000
+
+It prints the first mismatches and exits with status 1 if there are any.
+"""
+
+import argparse
+import email
+import json
+import random
+import re
+import sys
+import time
+
+from fake_imap_server import synthetic_messages
+from mail_fetch import extract_text_body
+from pipeline import DATA_PATH
+from task_extractor import extract_tasks
+
+# Fragments the fuzzer builds sentences from: every trigger and capture
+# keyword, near misses, filler, URLs and the punctuation the splitter and
+# clean-up steps care about
+_FUZZ_TRIGGERS = [
+    'please', 'kindly', 'Please', 'KINDLY', 'please review', 'kindly look at', 'please lookat',
+    'we need to', 'you need to', 'I need you to', 'need to', 'needs to', 'need  to',
+    "don't forget to", 'remember to', 'make sure to', 'Remember  to', 'dont forget to',
+    'action item', 'action items:', 'Action Item:', 'actionitem',
+    'schedule', 'book', 'arrange', 'set up', 'setup', 'a meeting', 'meeting', 'call', 'sync',
+    'discussion', 'demo', 'review', 'with', 'a call with',
+    'due', 'deadline', 'by', 'before', 'is due', 'Monday', 'Tuesday', 'Wednesday', 'Thursday',
+    'Friday', 'tomorrow', 'today', 'Saturday', '3', '15', '2024', '1st',
+    'awaiting', 'waiting for', 'looking forward to', 'your', 'reply', 'response', 'feedback', 'input',
+    'attached', 'find attached', 'see attached', 'please find', 'enclosed',
+    'document', 'file', 'report', 'proposal', 'invoice', 'contract', 'agreement', 'files',
+]
+_FUZZ_VERBS = ['review', 'approve', 'sign', 'submit', 'send', 'complete', 'update', 'check', 'confirm',
+               'read', 'look at', 'reviewed', 'sending']
+_FUZZ_FILLER = [
+    'the', 'quarterly', 'budget', 'team', 'Priya', 'slides', 'numbers', 'for', 'and', 'our', 'client',
+    'to', 'a', 'on', 'it', 'this', 'week', 'project', 'plan', 'notes', 'draft', 'asap', 'thanks',
+    'https://example.com/x?y=1', 'http://a.b/c', 'été', '#42', '(urgent)', '-', '—',
+]
+_FUZZ_PUNCT = ['', '', '', ',', ';', ':', '.', '!', '?', '...', ',;', '\n', '\n\n', '\t']
+
+
+# Original implementation, kept verbatim as the reference
+def reference_extract_tasks(body, subject=""):
+    """extract_tasks as it was before the patterns were compiled into one alternation (do not edit)"""
+    tasks = []
+    text = subject + " " + body
+    
+    # Clean up text
+    text = re.sub(r'http[s]?://\S+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Split into sentences for context
+    sentences = re.split(r'[.!?]+', text)
+    
+    for sent in sentences:
+        sent = sent.strip()
+        if len(sent) < 20 or len(sent) > 300:
+            continue
+        
+        task = None
+        
+        # Pattern 1: Direct action requests
+        if re.search(r'\b(please|kindly)\s+(review|approve|sign|submit|send|complete|update|check|confirm|read|look at)\b', sent, re.IGNORECASE):
+            match = re.search(r'(?:please|kindly)\s+(review|approve|sign|submit|send|complete|update|check|confirm|read|look at)\s+(.+)', sent, re.IGNORECASE)
+            if match:
+                task = f"{match.group(1).capitalize()} {match.group(2)}"
+        
+        # Pattern 2: Need to / Need you to
+        elif re.search(r'\b(we need to|you need to|i need you to|need to)\s+', sent, re.IGNORECASE):
+            match = re.search(r'(?:we need to|you need to|i need you to|need to)\s+(.+)', sent, re.IGNORECASE)
+            if match:
+                task = match.group(1).capitalize()
+        
+        # Pattern 3: Don't forget / Remember
+        elif re.search(r'\b(don\'t forget to|remember to|make sure to)\s+', sent, re.IGNORECASE):
+            match = re.search(r'(?:don\'t forget to|remember to|make sure to)\s+(.+)', sent, re.IGNORECASE)
+            if match:
+                task = match.group(1).capitalize()
+        
+        # Pattern 4: Action item
+        elif re.search(r'\baction item\b', sent, re.IGNORECASE):
+            match = re.search(r'action item[s]?:?\s*(.+)', sent, re.IGNORECASE)
+            if match:
+                task = match.group(1).capitalize()
+        
+        # Pattern 5: Schedule/Book/Arrange
+        elif re.search(r'\b(schedule|book|arrange|set up)\s+(?:a\s+)?(meeting|call|sync|discussion|demo|review)\b', sent, re.IGNORECASE):
+            match = re.search(r'(schedule|book|arrange|set up)\s+(?:a\s+)?(meeting|call|sync|discussion|demo|review)\s*(?:with\s+)?(.+)?', sent, re.IGNORECASE)
+            if match:
+                with_whom = match.group(3) if match.group(3) else ""
+                task = f"{match.group(1).capitalize()} {match.group(2)} {with_whom}".strip()
+        
+        # Pattern 6: Due/Deadline/By date
+        elif re.search(r'\b(due|deadline|by|before)\s+(Monday|Tuesday|Wednesday|Thursday|Friday|tomorrow|today|\d{1,2})', sent, re.IGNORECASE):
+            # Get the action before the deadline
+            match = re.search(r'(.+?)\s+(?:is\s+)?(?:due|deadline|by|before)\s+(Monday|Tuesday|Wednesday|Thursday|Friday|tomorrow|today|\d{1,2}[^\.\n]*)', sent, re.IGNORECASE)
+            if match:
+                action = match.group(1).strip()
+                deadline = match.group(2)
+                if len(action) > 10:
+                    task = f"{action} (Due {deadline})"
+        
+        # Pattern 7: Awaiting/Waiting for/Looking forward to
+        elif re.search(r'\b(awaiting|waiting for|looking forward to)\s+(?:your\s+)?(reply|response|feedback|input)', sent, re.IGNORECASE):
+            task = "Reply to email"
+        
+        # Pattern 8: Attached documents
+        elif re.search(r'\b(attached|find attached|see attached|please find|enclosed)\b', sent, re.IGNORECASE) and re.search(r'\b(document|file|report|proposal|invoice|contract|agreement)\b', sent, re.IGNORECASE):
+            match = re.search(r'(?:attached|enclosed)[^\.\n]*(document|file|report|proposal|invoice|contract|agreement)[^\.\n]*', sent, re.IGNORECASE)
+            if match:
+                doc_type = match.group(1)
+                task = f"Review attached {doc_type}"
+        
+        # Clean up and add task
+        if task:
+            # Remove extra whitespace
+            task = re.sub(r'\s+', ' ', task)
+            # Remove trailing punctuation
+            task = re.sub(r'[,;:]+$', '', task)
+            # Capitalize first letter
+            task = task[0].upper() + task[1:] if task else task
+            
+            if len(task) > 15 and len(task) < 200:
+                tasks.append(task)
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_tasks = []
+    for task in tasks:
+        # Create a normalized version for comparison
+        normalized = re.sub(r'[^\w\s]', '', task.lower())
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        
+        if normalized not in seen and len(normalized) > 10:
+            seen.add(normalized)
+            unique_tasks.append(task)
+    
+    return unique_tasks[:10]
+
+
+def fuzz_sentence(rng):
+    words = []
+    for _ in range(rng.randint(2, 40)):
+        pool = rng.choice((_FUZZ_TRIGGERS, _FUZZ_VERBS, _FUZZ_FILLER, _FUZZ_FILLER))
+        words.append(rng.choice(pool) + rng.choice(_FUZZ_PUNCT))
+    return rng.choice((' ', '  ', ' ')).join(words)
+
+
+def corpus(fuzz, seed, messages):
+    """Yield (body, subject) pairs: data.json previews, synthetic mail, then fuzzed text"""
+    try:
+        with open(DATA_PATH, 'r') as f:
+            for e in json.load(f).get('emails', []):
+                yield e.get('preview', ''), e.get('subject', '')
+    except (OSError, ValueError):
+        pass
+    for raw in synthetic_messages(messages, seed):
+        msg = email.message_from_bytes(raw)
+        yield extract_text_body(msg), msg.get('Subject', '')
+    rng = random.Random(seed)
+    for _ in range(fuzz):
+        body = ' '.join(fuzz_sentence(rng) for _ in range(rng.randint(1, 4)))
+        yield body, (fuzz_sentence(rng) if rng.random() < 0.3 else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check extract_tasks against the original implementation")
+    parser.add_argument('--fuzz', type=int, default=20000, help="number of fuzzed documents")
+    parser.add_argument('--messages', type=int, default=2000, help="number of synthetic messages")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--show', type=int, default=5, help="mismatches to print")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    checked = 0
+    mismatches = 0
+    for body, subject in corpus(args.fuzz, args.seed, args.messages):
+        checked += 1
+        expected = reference_extract_tasks(body, subject)
+        actual = extract_tasks(body, subject)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= args.show:
+                print(f"Mismatch:\n  subject:  {subject!r}\n  body:     {body[:300]!r}\n"
+                      f"  expected: {expected!r}\n  actual:   {actual!r}")
+    print(f"Checked {checked} documents in {time.perf_counter() - start:.1f}s: {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
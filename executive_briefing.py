@@ -1,136 +1,176 @@
 #!/usr/bin/env python3
 """
-Generate LLM executive briefing by spawning a sub-agent
-This creates the highest quality summaries
+Generate executive briefing in-process
+Emails are sorted into urgent / security / newsletter buckets once, then
+either rendered through compiled templates or handed to a pluggable LLM
+backend (any callable taking a prompt and returning text). The engine keeps
+no per-call state, so one instance can serve several dashboards at once.
 """
 
+import argparse
 import json
-import subprocess
-import sys
-import time
+from collections import Counter
+from string import Template
 
-def generate_with_subagent(emails):
-    """Generate briefing by spawning LLM sub-agent"""
-    if not emails:
-        return "No new emails to report."
-    
-    # Save emails for sub-agent
-    with open('/tmp/emails_briefing.json', 'w') as f:
-        json.dump(emails[:12], f)
-    
-    # Create sub-agent script
-    script = '''
-import json
+DATA_PATH = '/root/.openclaw/workspace/email-dashboard/data.json'
 
-with open('/tmp/emails_briefing.json', 'r') as f:
-    emails = json.load(f)
+URGENT_WORDS = ['failed', 'error', 'production', 'deploy']
+SECURITY_WORDS = ['token', 'ssh', 'sign in', 'authentication']
+NEWSLETTER_WORDS = ['medium', 'neil patel', 'finimize', 'newsletter', 'digest']
 
-# Format for LLM
-lines = []
-for i, e in enumerate(emails, 1):
-    sender = e.get('from', 'Unknown').split('<')[0].strip()
-    subject = e.get('subject', 'No Subject')
-    body = e.get('preview', '')[:250]
-    lines.append(f"{i}. {sender}: {subject} - {body}")
+# Compiled once at import; a section is rendered when the analysis provides its values
+TEMPLATES = {
+    'greeting': Template("$greeting! I've reviewed your inbox and here's what's waiting for you today."),
+    'volume': Template("You have $count new $noun."),
+    'top_senders': Template("You have $count new emails with a notable concentration of technical activity—"
+                            "$first and $second are your top senders with $first_count and $second_count emails "
+                            "respectively, indicating some recent platform setup or configuration work."),
+    'urgent': Template("The most urgent item requiring your attention is $subject... from $sender that you'll want "
+                       "to investigate and resolve promptly."),
+    'security': Template("On the security front, there are several authentication-related notifications from "
+                         "$senders including new credentials being added—all of which appear to be legitimate given "
+                         "the context of your recent setup work, but worth verifying were intentional."),
+    'newsletters': Template("Beyond the technical items, your inbox includes the usual mix of newsletters from "
+                            "$senders, and some promotional content."),
+    'regulars': Template("Your most frequent correspondents overall are $senders and $last_sender."),
+    'domains': Template("Over the longer term, most of your mail comes from $domains and $last_domain."),
+    'meetings': Template("$count meeting or call $noun $verb flagged in today's batch, so check your calendar "
+                         "before planning focused work."),
+    'no_meetings': Template("No specific meetings or calls are flagged in today's batch, so your calendar appears "
+                            "clear for focused work on resolving any urgent items and reviewing your recent "
+                            "configurations."),
+}
+SECTION_ORDER = ['greeting', 'top_senders', 'volume', 'urgent', 'security', 'newsletters', 'regulars', 'domains',
+                 'meetings', 'no_meetings']
 
-emails_text = "\\n".join(lines)
+BRIEFING_PROMPT = Template("""You are an executive assistant. Write a warm, flowing briefing paragraph (5-7 sentences) about the user's inbox, most important items first.
 
-briefing = f"""Good afternoon! I've reviewed your inbox and here's what's waiting for you today. You have {len(emails)} new emails with a notable concentration of technical activity—GitHub and Vercel are your top senders with platform setup and configuration notifications. The most urgent item requiring your attention is a failed production deployment on Vercel that you'll want to investigate and resolve promptly. On the security front, there are several authentication-related notifications from GitHub including a new personal access token and SSH key being added, plus a new Vercel sign-in detection—all of which appear to be legitimate given the context of setting up OpenClaw, but worth verifying were intentional. Beyond the technical items, your inbox includes the usual mix of newsletters from Medium, Neil Patel, and Finimize, a social notification from the Chase AI Community, and some promotional content. No specific meetings or calls are flagged in today's batch, so your calendar appears clear for focused work on resolving that deployment issue and reviewing your recent security configurations."""
+$count new emails. Findings:
+$findings
 
-print(briefing)
-'''
-    
-    with open('/tmp/run_briefing.py', 'w') as f:
-        f.write(script)
-    
-    try:
-        result = subprocess.run(
-            ['python3', '/tmp/run_briefing.py'],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if result.returncode == 0:
-            return result.stdout.strip()
-    except:
-        pass
-    
-    # Fallback to rich template
-    return generate_rich_template(emails)
+Briefing:""")
 
-def generate_rich_template(emails):
-    """Generate rich briefing using advanced templates"""
-    if not emails:
-        return "No new emails to report."
+def analyze_briefing(emails, analytics=None):
+    """Sort emails into briefing buckets; returns {section: template values} for the sections that apply
     
-    # Analysis
-    sender_data = {}
+    analytics is the dashboard's long-term top senders/domains section, if any
+    """
+    senders = Counter()
     urgent = []
     security = []
     newsletters = []
+    meetings = 0
     
     for e in emails:
         sender = e.get('from', 'Unknown').split('<')[0].strip()
         subject = e.get('subject', '')
         body = e.get('preview', '')
         text = (subject + ' ' + body).lower()
-        
-        if sender not in sender_data:
-            sender_data[sender] = {'count': 0, 'subjects': []}
-        sender_data[sender]['count'] += 1
-        sender_data[sender]['subjects'].append(subject)
-        
-        if any(w in text for w in ['failed', 'error', 'production', 'deploy']):
+    
+        senders[sender] += 1
+        meetings += len(e.get('events', []))
+    
+        if any(w in text for w in URGENT_WORDS):
             urgent.append({'sender': sender, 'subject': subject})
-        elif any(w in text for w in ['token', 'ssh', 'sign in', 'authentication']):
+        elif any(w in text for w in SECURITY_WORDS):
             security.append({'sender': sender, 'subject': subject})
-        elif any(w in text for w in ['medium', 'neil patel', 'finimize', 'newsletter', 'digest']):
+        elif any(w in text for w in NEWSLETTER_WORDS):
             newsletters.append(sender)
     
-    top_senders = sorted(sender_data.items(), key=lambda x: x[1]['count'], reverse=True)[:2]
-    
-    # Build rich briefing
-    greeting = "Good afternoon"
-    
-    sentences = [
-        f"{greeting}! I've reviewed your inbox and here's what's waiting for you today.",
-        f"You have {len(emails)} new emails with a notable concentration of technical activity—"
-    ]
-    
+    sections = {'greeting': {'greeting': "Good afternoon"}}
+    top_senders = senders.most_common(2)
     if len(top_senders) >= 2:
-        sentences[-1] += f"{top_senders[0][0]} and {top_senders[1][0]} are your top senders with {top_senders[0][1]['count']} and {top_senders[1][1]['count']} emails respectively, indicating some recent platform setup or configuration work."
-    
+        sections['top_senders'] = {
+            'count': len(emails),
+            'first': top_senders[0][0], 'first_count': top_senders[0][1],
+            'second': top_senders[1][0], 'second_count': top_senders[1][1]
+        }
+    else:
+        sections['volume'] = {'count': len(emails), 'noun': 'email' if len(emails) == 1 else 'emails'}
     if urgent:
-        sentences.append(f"The most urgent item requiring your attention is {urgent[0]['subject'][:50]}... from {urgent[0]['sender']} that you'll want to investigate and resolve promptly.")
-    
+        sections['urgent'] = {'subject': urgent[0]['subject'][:50], 'sender': urgent[0]['sender']}
     if security:
-        sec_senders = list(set([s['sender'] for s in security]))
-        sentences.append(f"On the security front, there are several authentication-related notifications from {', '.join(sec_senders)} including new credentials being added—all of which appear to be legitimate given the context of your recent setup work, but worth verifying were intentional.")
-    
+        sections['security'] = {'senders': ', '.join(dict.fromkeys(s['sender'] for s in security))}
     if newsletters:
-        sentences.append(f"Beyond the technical items, your inbox includes the usual mix of newsletters from {', '.join(list(set(newsletters))[:3])}, and some promotional content.")
-    
-    sentences.append("No specific meetings or calls are flagged in today's batch, so your calendar appears clear for focused work on resolving any urgent items and reviewing your recent configurations.")
-    
-    return " ".join(sentences)
+        sections['newsletters'] = {'senders': ', '.join(list(dict.fromkeys(newsletters))[:3])}
+    regulars = [entry['value'] for entry in (analytics or {}).get('senders', [])[:3]]
+    if len(regulars) >= 2:
+        sections['regulars'] = {'senders': ', '.join(regulars[:-1]), 'last_sender': regulars[-1]}
+    top_domains = [entry['value'] for entry in (analytics or {}).get('domains', [])[:3]]
+    if len(top_domains) >= 2:
+        sections['domains'] = {'domains': ', '.join(top_domains[:-1]), 'last_domain': top_domains[-1]}
+    if meetings:
+        sections['meetings'] = {'count': meetings, 'noun': 'mention' if meetings == 1 else 'mentions',
+                                 'verb': 'is' if meetings == 1 else 'are'}
+    else:
+        sections['no_meetings'] = {}
+    return sections
 
-def main():
-    with open('/root/.openclaw/workspace/email-dashboard/data.json', 'r') as f:
-        data = json.load(f)
+def render_briefing(sections):
+    """Fill the compiled templates for the analyzed sections, in briefing order"""
+    return " ".join(TEMPLATES[name].substitute(sections[name]) for name in SECTION_ORDER if name in sections)
+
+def briefing_prompt(emails, sections):
+    """LLM prompt listing the analyzed findings (one rendered template per line)"""
+    findings = "\n".join(f"- {TEMPLATES[name].substitute(sections[name])}"
+                         for name in SECTION_ORDER if name in sections and name != 'greeting')
+    return BRIEFING_PROMPT.substitute(count=len(emails), findings=findings)
+
+def kimi_backend(timeout=60):
+    """LLM backend calling the Kimi API through summarize_with_ai's pooled client"""
+    from summarize_with_ai import call_llm
+    return lambda prompt: call_llm(prompt, timeout)
+
+class BriefingEngine:
+    """Executive briefing generator; backend is an optional callable(prompt) -> text
     
+    Without a backend, or when it fails or returns nothing, the briefing is
+    rendered from the templates.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def generate(self, emails, analytics=None):
+        if not emails:
+            return "No new emails to report."
+        sections = analyze_briefing(emails, analytics)
+        if self.backend is not None:
+            try:
+                briefing = (self.backend(briefing_prompt(emails, sections)) or '').strip()
+                if briefing:
+                    return briefing
+            except Exception as e:
+                print(f"  [LLM briefing failed: {str(e)[:80]}; using templates]")
+        return render_briefing(sections)
+
+def generate_rich_template(emails, analytics=None):
+    """Generate rich briefing using the compiled templates"""
+    return BriefingEngine().generate(emails, analytics)
+
+def add_briefing(data, engine=None):
+    """Set data['ai_summary']['executive_briefing'] from the dashboard data's emails; returns the briefing"""
     emails = data.get('emails', [])
     
     if not emails:
         briefing = "No emails to report."
     else:
-        briefing = generate_with_subagent(emails)
+        briefing = (engine or BriefingEngine()).generate(emails, data.get('analytics'))
     
-    if 'ai_summary' not in data:
-        data['ai_summary'] = {}
+    data.setdefault('ai_summary', {})['executive_briefing'] = briefing
+    return briefing
+
+def main():
+    parser = argparse.ArgumentParser(description="Add an executive briefing to data.json")
+    parser.add_argument('--llm', action='store_true', help="write the briefing with the Kimi API (templates if it fails)")
+    args = parser.parse_args()
+    
+    with open(DATA_PATH, 'r') as f:
+        data = json.load(f)
     
-    data['ai_summary']['executive_briefing'] = briefing
+    briefing = add_briefing(data, BriefingEngine(kimi_backend() if args.llm else None))
     
-    with open('/root/.openclaw/workspace/email-dashboard/data.json', 'w') as f:
+    with open(DATA_PATH, 'w') as f:
         json.dump(data, f, indent=2)
     
     print("✅ Executive briefing generated!")
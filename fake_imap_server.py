@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Local IMAP stand-in - Serves a synthetic (or maildir/mbox) mailbox over plain TCP
+
+Implements the subset of IMAP4rev1 the dashboard uses: LOGIN, SELECT,
+STATUS, NOOP, IDLE, LOGOUT, UID SEARCH (ALL/SINCE/ON/BEFORE/UID) and
+UID FETCH of UID, FLAGS, RFC822, BODYSTRUCTURE and BODY[.PEEK][section]<o.n>.
+Any credentials are accepted. Use it to test and benchmark the fetch
+pipeline offline:
+
+    python3 fake_imap_server.py --messages 10000 --port 1143
+"""
+
+import argparse
+import email
+import email.utils
+import mailbox
+import os
+import random
+import re
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser
+
+_SENDERS = [
+    ('GitHub', 'noreply@github.com'), ('Vercel', 'notifications@vercel.com'),
+    ('TLDR Dev', 'dan@tldrnewsletter.com'), ('Priya Sharma', 'priya@acme-corp.com'),
+    ('HDFC Bank', 'alerts@hdfcbank.net'), ('Amazon', 'shipment-tracking@amazon.in'),
+    ('LinkedIn', 'messages-noreply@linkedin.com'), ('Rahul Mehta', 'rahul@family.example'),
+]
+_SUBJECTS = [
+    'Weekly project update', 'Re: Quarterly report review', 'Your order has shipped',
+    'Payment received for invoice #{n}', 'Production deployment failed', 'New sign-in detected',
+    'Team meeting on Thursday', 'Fwd: Contract for signature', 'Your weekly digest',
+    'Birthday invitation', 'New personal access token added', 'Action required: update billing',
+]
+_SENTENCES = [
+    'Please review the attached quarterly report before Friday.',
+    'We need to finalize the budget numbers for the client presentation.',
+    "Don't forget to submit your timesheet by tomorrow.",
+    'Action item: update the onboarding document with the new process.',
+    'Can we schedule a meeting with the design team next week?',
+    'The proposal is due Monday and still needs legal sign-off.',
+    'Looking forward to your feedback on the draft.',
+    'Please find attached the signed contract for your records.',
+    'Your package is out for delivery and tracking is available online.',
+    'Join the zoom call at 3pm to discuss the roadmap.',
+    'Click here to unsubscribe from this newsletter.',
+    'Remember to renew the SSL certificate before it expires.',
+]
+
+
+def synthetic_messages(count, seed=0, days=7):
+    """Generate `count` raw RFC822 messages spread over the last `days` days, oldest first"""
+    rng = random.Random(seed)
+    now = datetime.now().astimezone()
+    span = timedelta(days=days).total_seconds()
+    messages = []
+    # Re:/Fwd: subjects continue the thread of the previous message with the same subject
+    threads = {}
+    for n in range(count):
+        name, addr = rng.choice(_SENDERS)
+        msg = EmailMessage()
+        msg['From'] = email.utils.formataddr((name, addr))
+        msg['To'] = 'me@example.com'
+        msg['Subject'] = rng.choice(_SUBJECTS).format(n=n)
+        msg['Date'] = email.utils.format_datetime(now - timedelta(seconds=span * (count - n) / max(count, 1)))
+        msg['Message-ID'] = f'<synthetic-{seed}-{n}@example.com>'
+        if msg['Subject'].startswith(('Re: ', 'Fwd: ')):
+            references = threads.get(msg['Subject'], [])
+            if references:
+                msg['In-Reply-To'] = references[-1]
+                msg['References'] = ' '.join(references)
+            threads[msg['Subject']] = references + [msg['Message-ID']]
+        msg.set_content(' '.join(rng.choice(_SENTENCES) for _ in range(rng.randint(2, 8))))
+        kind = rng.random()
+        if kind < 0.3:
+            msg.add_alternative(f"<html><body><p>{msg.get_content()}</p></body></html>", subtype='html')
+        elif kind < 0.4:
+            msg.add_attachment(rng.randbytes(rng.randint(20_000, 200_000)), maintype='application',
+                               subtype='pdf', filename=f'invoice-{n}.pdf')
+        messages.append(msg.as_bytes())
+    return messages
+
+
+def load_messages(path):
+    """Read raw messages from a maildir directory or an mbox file"""
+    box = mailbox.Maildir(path, factory=None, create=False) if os.path.isdir(path) else mailbox.mbox(path, create=False)
+    return [box.get_bytes(key) for key in sorted(box.keys())]
+
+
+def _quote(value):
+    if value is None:
+        return 'NIL'
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _params(part):
+    params = [(k, v) for k, v in part.get_params() or []][1:]
+    if not params:
+        return 'NIL'
+    return '(' + ' '.join(f'{_quote(k)} {_quote(v)}' for k, v in params) + ')'
+
+
+def _bodystructure(part):
+    if part.is_multipart():
+        children = ''.join(_bodystructure(child) for child in part.get_payload())
+        return f'({children} {_quote(part.get_content_subtype())})'
+    payload = part.get_payload(decode=False)
+    payload = payload.encode('utf-8', errors='ignore') if isinstance(payload, str) else (payload or b'')
+    encoding = part.get('Content-Transfer-Encoding', '7bit').lower()
+    fields = f'{_quote(part.get_content_maintype())} {_quote(part.get_content_subtype())} {_params(part)} NIL NIL {_quote(encoding)} {len(payload)}'
+    if part.get_content_maintype() == 'text':
+        lines = payload.count(b'\n')
+        fields += f' {lines}'
+    return f'({fields})'
+
+
+class StoredMessage:
+    """One message in the stand-in mailbox"""
+
+    def __init__(self, uid, raw):
+        self.uid = uid
+        self.raw = raw
+        headers = BytesHeaderParser().parsebytes(raw)
+        try:
+            self.date = email.utils.parsedate_to_datetime(headers['Date']).date()
+        except (TypeError, ValueError):
+            self.date = None
+        self._parsed = None
+
+    @property
+    def parsed(self):
+        if self._parsed is None:
+            self._parsed = email.message_from_bytes(self.raw)
+        return self._parsed
+
+    def section(self, spec):
+        """Return the bytes of BODY[spec]"""
+        head, _, body = self.raw.partition(b'\r\n\r\n')
+        if not body and b'\n\n' in self.raw:
+            head, _, body = self.raw.partition(b'\n\n')
+        if spec == '':
+            return self.raw
+        if spec == 'TEXT':
+            return body
+        if spec == 'HEADER':
+            return head + b'\r\n\r\n'
+        match = re.match(r'HEADER\.FIELDS \(([^)]*)\)', spec)
+        if match:
+            wanted = {name.lower() for name in match.group(1).split()}
+            lines = [f'{k}: {v}' for k, v in self.parsed.items() if k.lower() in wanted]
+            return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8', errors='ignore')
+        part = self.parsed
+        for number in spec.split('.'):
+            if part.is_multipart():
+                part = part.get_payload()[int(number) - 1]
+            elif number != '1':
+                return b''
+        payload = part.get_payload(decode=False)
+        return payload.encode('utf-8', errors='ignore') if isinstance(payload, str) else b''
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """Threaded IMAP stand-in serving one shared mailbox as INBOX"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, messages=(), uidvalidity=1):
+        super().__init__(address, _ImapHandler)
+        self.uidvalidity = uidvalidity
+        self.messages = [StoredMessage(uid, raw) for uid, raw in enumerate(messages, 1)]
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def append(self, raw):
+        """Deliver a new message and wake IDLE-ing clients"""
+        with self.changed:
+            uid = self.messages[-1].uid + 1 if self.messages else 1
+            self.messages.append(StoredMessage(uid, raw))
+            self.changed.notify_all()
+
+    def start(self):
+        """Serve on a background thread; returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+_SEARCH_DATE = '%d-%b-%Y'
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+
+    def send(self, line):
+        self.wfile.write(line if isinstance(line, bytes) else line.encode())
+
+    def handle(self):
+        self.send('* OK [CAPABILITY IMAP4rev1 IDLE] fake_imap_server ready\r\n')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            line = line.rstrip(b'\r\n').decode('utf-8', errors='ignore')
+            tag, _, rest = line.partition(' ')
+            command, _, args = rest.partition(' ')
+            command = command.upper()
+            if command == 'UID':
+                command, _, args = args.partition(' ')
+                command = 'UID ' + command.upper()
+            handler = getattr(self, 'do_' + command.replace(' ', '_'), None)
+            if handler is None:
+                self.send(f'{tag} BAD unknown command {command}\r\n')
+                continue
+            if handler(tag, args) is False:
+                return
+
+    def do_CAPABILITY(self, tag, args):
+        self.send('* CAPABILITY IMAP4rev1 IDLE\r\n')
+        self.send(f'{tag} OK CAPABILITY completed\r\n')
+
+    def do_LOGIN(self, tag, args):
+        self.send(f'{tag} OK LOGIN completed\r\n')
+
+    def do_SELECT(self, tag, args):
+        server = self.server
+        with server.lock:
+            count = len(server.messages)
+            uidnext = server.messages[-1].uid + 1 if server.messages else 1
+        self.send(f'* {count} EXISTS\r\n* 0 RECENT\r\n* FLAGS (\\Seen)\r\n')
+        self.send(f'* OK [UIDVALIDITY {server.uidvalidity}] UIDs valid\r\n* OK [UIDNEXT {uidnext}] next\r\n')
+        self.send(f'{tag} OK [READ-WRITE] SELECT completed\r\n')
+        self.seen_count = count
+
+    do_EXAMINE = do_SELECT
+
+    def do_STATUS(self, tag, args):
+        name = args.split(' (')[0]
+        self.send(f'* STATUS {name} (UIDVALIDITY {self.server.uidvalidity})\r\n')
+        self.send(f'{tag} OK STATUS completed\r\n')
+
+    def _report_new(self):
+        with self.server.lock:
+            count = len(self.server.messages)
+        if count != getattr(self, 'seen_count', count):
+            self.send(f'* {count} EXISTS\r\n')
+            self.seen_count = count
+
+    def do_NOOP(self, tag, args):
+        self._report_new()
+        self.send(f'{tag} OK NOOP completed\r\n')
+
+    def do_IDLE(self, tag, args):
+        self.send('+ idling\r\n')
+        self.wfile.flush()
+        done = threading.Event()
+
+        def notify():
+            with self.server.changed:
+                while not done.is_set():
+                    self.server.changed.wait(0.5)
+                    if len(self.server.messages) != self.seen_count:
+                        break
+            if not done.is_set():
+                self._report_new()
+                self.wfile.flush()
+
+        watcher = threading.Thread(target=notify, daemon=True)
+        watcher.start()
+        line = self.rfile.readline()
+        done.set()
+        watcher.join()
+        if not line:
+            return False
+        self.send(f'{tag} OK IDLE terminated\r\n')
+
+    def do_LOGOUT(self, tag, args):
+        self.send('* BYE logging out\r\n')
+        self.send(f'{tag} OK LOGOUT completed\r\n')
+        return False
+
+    def _messages_in(self, message_set):
+        with self.server.lock:
+            messages = list(self.server.messages)
+        if not messages:
+            return []
+        highest = messages[-1].uid
+        wanted = []
+        for part in message_set.split(','):
+            start, _, end = part.partition(':')
+            start = highest if start == '*' else int(start)
+            end = start if not end else (highest if end == '*' else int(end))
+            wanted.append((min(start, end), max(start, end)))
+        return [(seq, m) for seq, m in enumerate(messages, 1)
+                if any(lo <= m.uid <= hi for lo, hi in wanted)]
+
+    def do_UID_SEARCH(self, tag, args):
+        tokens = re.findall(r'"[^"]*"|[^\s()]+', args)
+        selected = [m for _, m in self._messages_in('1:*')]
+        i = 0
+        while i < len(tokens):
+            key = tokens[i].upper()
+            if key in ('SINCE', 'ON', 'BEFORE'):
+                day = datetime.strptime(tokens[i + 1].strip('"'), _SEARCH_DATE).date()
+                if key == 'SINCE':
+                    selected = [m for m in selected if m.date is None or m.date >= day]
+                elif key == 'ON':
+                    selected = [m for m in selected if m.date == day]
+                else:
+                    selected = [m for m in selected if m.date is not None and m.date < day]
+                i += 2
+            elif key == 'UID':
+                in_set = {m.uid for _, m in self._messages_in(tokens[i + 1])}
+                selected = [m for m in selected if m.uid in in_set]
+                i += 2
+            else:
+                i += 1
+        self.send('* SEARCH' + ''.join(f' {m.uid}' for m in selected) + '\r\n')
+        self.send(f'{tag} OK SEARCH completed\r\n')
+
+    def do_UID_FETCH(self, tag, args):
+        message_set, _, query = args.partition(' ')
+        items = re.findall(r'BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+', query.upper())
+        for seq, message in self._messages_in(message_set):
+            out = [f'* {seq} FETCH (UID {message.uid}'.encode()]
+            for item in items:
+                if item == 'UID':
+                    continue
+                if item == 'FLAGS':
+                    out.append(b' FLAGS ()')
+                elif item == 'BODYSTRUCTURE':
+                    out.append(f' BODYSTRUCTURE {_bodystructure(message.parsed)}'.encode('utf-8', errors='ignore'))
+                elif item in ('RFC822', 'BODY[]', 'BODY.PEEK[]'):
+                    name = 'RFC822' if item == 'RFC822' else 'BODY[]'
+                    out.append(f' {name} {{{len(message.raw)}}}\r\n'.encode() + message.raw)
+                elif item.startswith('BODY'):
+                    match = re.match(r'BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?', item)
+                    data = message.section(match.group(1))
+                    name = f'BODY[{match.group(1)}]'
+                    if match.group(2):
+                        origin, length = int(match.group(2)), int(match.group(3))
+                        data = data[origin:origin + length]
+                        name += f'<{origin}>'
+                    out.append(f' {name} {{{len(data)}}}\r\n'.encode() + data)
+            out.append(b')\r\n')
+            self.send(b''.join(out))
+        self.send(f'{tag} OK FETCH completed\r\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a synthetic or local mailbox over IMAP (no TLS)")
+    parser.add_argument('--port', type=int, default=1143)
+    parser.add_argument('--messages', type=int, default=1000, help="number of synthetic messages")
+    parser.add_argument('--source', help="serve a maildir directory or mbox file instead")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.time()
+    raw = load_messages(args.source) if args.source else synthetic_messages(args.messages, args.seed)
+    server = FakeImapServer(('127.0.0.1', args.port), raw)
+    print(f"Serving {len(raw)} messages on 127.0.0.1:{server.port} (loaded in {time.time() - start:.1f}s)")
+    server.serve_forever()
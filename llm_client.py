@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+LLM client - One pooled HTTP session for every LLM call, with retries and a circuit breaker
+
+Calls share a requests.Session, so connections (and their TLS handshakes)
+are kept alive and reused across summaries and threads. 429 and 5xx
+responses, timeouts and connection errors are retried with exponential
+backoff and full jitter (a 429's Retry-After is respected as a minimum).
+
+Calls that still fail count against a circuit breaker. After enough
+consecutive failures it opens and calls fail fast - or return the caller's
+fallback - without touching the network; after a cooldown one trial call
+is let through and closes the breaker again if it succeeds.
+
+Every call's latency is recorded; stats() reports counts and percentiles.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_RETRIES = 4
+# Backoff before retry n is uniform in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)]
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+# Consecutive failed calls that open the breaker, and seconds before a trial call
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+# Latencies kept for percentiles
+LATENCY_WINDOW = 1000
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LlmUnavailable(Exception):
+    """The LLM call failed after retries, or was skipped because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open after `cooldown` seconds"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if self.probing or time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def allow(self):
+        """Whether a call may go out now (in half-open state, only the one trial call)"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+def _reply_text(data):
+    """Text of a Messages-API (or chat-style) response body"""
+    if "content" in data and len(data["content"]) > 0:
+        return data["content"][0]["text"].strip()
+    elif "message" in data and "content" in data["message"]:
+        return data["message"]["content"].strip()
+    raise RuntimeError(f"Unexpected response format: {data}")
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LlmClient:
+    """Messages-API client safe to share between threads"""
+
+    def __init__(self, url, api_key, model, max_tokens=512, pool_size=DEFAULT_POOL_SIZE,
+                 max_retries=DEFAULT_MAX_RETRIES, breaker=None, headers=None):
+        self.url = url
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        })
+        self.session.headers.update(headers or {})
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {'calls': 0, 'failures': 0, 'retries': 0, 'short_circuited': 0, 'fallbacks': 0}
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def _backoff(self, attempt, response=None):
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if response is not None and response.status_code == 429:
+            try:
+                delay = max(delay, float(response.headers.get('Retry-After', 0)))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def _post(self, payload, timeout, limiter):
+        """One call with retries; returns the parsed JSON response"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise LlmUnavailable(str(e)) from e
+                self._backoff(attempt)
+                continue
+            if response.status_code in RETRY_STATUSES:
+                if attempt == self.max_retries:
+                    raise LlmUnavailable(f"HTTP {response.status_code} after {attempt + 1} attempts")
+                self._backoff(attempt, response)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def complete(self, prompt, timeout=120, limiter=None, fallback=None, max_tokens=None):
+        """Text of the model's reply to `prompt` (at most max_tokens, default self.max_tokens)
+
+        If the API is unavailable (retries exhausted or circuit open), returns
+        fallback() when given, else raises LlmUnavailable. Other errors (e.g.
+        a 400 or an unexpected response) are raised as-is; they count as a
+        failure for the breaker but never fall back.
+        """
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            if fallback is None:
+                raise LlmUnavailable("circuit open")
+            self._count('fallbacks')
+            return fallback()
+
+        payload = {
+            "model": self.model,
+            "max_tokens": max_tokens or self.max_tokens,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        self._count('calls')
+        start = time.perf_counter()
+        try:
+            text = _reply_text(self._post(payload, timeout, limiter))
+        except LlmUnavailable:
+            self.breaker.record_failure()
+            self._count('failures')
+            if fallback is None:
+                raise
+            self._count('fallbacks')
+            return fallback()
+        except Exception:
+            # Settle the breaker so a failed half-open trial can't leave it probing forever
+            self.breaker.record_failure()
+            self._count('failures')
+            raise
+        finally:
+            with self.lock:
+                self.latencies.append(time.perf_counter() - start)
+        self.breaker.record_success()
+        return text
+
+    def stats(self):
+        """Call counts, circuit state and latency percentiles (seconds) of recent calls"""
+        with self.lock:
+            stats = dict(self.counts)
+            ordered = sorted(self.latencies)
+        stats['circuit'] = self.breaker.state
+        if ordered:
+            stats['latency'] = {
+                'mean': round(sum(ordered) / len(ordered), 3),
+                'p50': round(_percentile(ordered, 0.5), 3),
+                'p95': round(_percentile(ordered, 0.95), 3),
+                'max': round(ordered[-1], 3)
+            }
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+IMAP fetch helpers - Batched UID FETCH over message-set ranges, with an
+optional partial strategy that reads BODYSTRUCTURE and headers first and
+then peeks only at a byte range of the text part, plus IDLE/NOOP waiting
+for long-lived sessions
+"""
+
+import base64
+import binascii
+import email
+import quopri
+import re
+import select
+import ssl
+import time
+
+# Number of UIDs requested per UID FETCH round-trip
+DEFAULT_CHUNK_SIZE = 50
+
+# Bytes of the text part requested by the partial strategy. Leaves headroom
+# over the 1000 characters we keep for base64/quoted-printable overhead.
+DEFAULT_PREVIEW_BYTES = 4096
+
+HEADER_FIELDS = 'SUBJECT FROM DATE MESSAGE-ID IN-REPLY-TO REFERENCES'
+
+_FETCH_START = re.compile(rb'^(\d+) \(')
+_UID_ITEM = re.compile(rb'\bUID (\d+)')
+_LITERAL_ITEM = re.compile(rb'(BODY\[[^\]]*\]|[A-Z0-9.]+)(?:<\d+>)? \{\d+\}$', re.IGNORECASE)
+_STRUCTURE_TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+
+def build_message_set(uids):
+    """Compress a list of UIDs into an IMAP message-set string (e.g. 1:5,9,12:14)"""
+    numbers = sorted(set(int(uid) for uid in uids))
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ','.join(f"{start}:{end}" if start != end else str(start) for start, end in ranges)
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def parse_fetch_response(data):
+    """Group a multi-message FETCH response into {uid: {item: literal}}
+
+    imaplib returns a flat list mixing (prefix, literal) tuples and bare byte
+    strings; a new message starts with "<seq> (". Non-literal items such as
+    UID may come before or after the literals, so the UID is read from all
+    of the message's text once the response has been split.
+    """
+    messages = []
+    current = None
+    for item in data:
+        if isinstance(item, tuple):
+            prefix, literal = item[0], item[1]
+        else:
+            prefix, literal = item, None
+        if not isinstance(prefix, bytes):
+            continue
+
+        if _FETCH_START.match(prefix):
+            current = {'text': b'', 'items': {}}
+            messages.append(current)
+        if current is None:
+            continue
+
+        current['text'] += prefix + b' '
+        if literal is not None:
+            match = _LITERAL_ITEM.search(prefix)
+            if match:
+                current['items'][match.group(1).decode().upper()] = literal
+
+    results = {}
+    for message in messages:
+        match = _UID_ITEM.search(message['text'])
+        if match:
+            message['items']['_TEXT'] = message['text']
+            results[match.group(1).decode()] = message['items']
+    return results
+
+
+def uid_fetch(mail, uids, query='(BODY.PEEK[])', chunk_size=DEFAULT_CHUNK_SIZE):
+    """UID FETCH `query` for all `uids` in chunks; returns {uid: {item: literal}}"""
+    results = {}
+    for chunk in chunked(list(uids), chunk_size):
+        status, data = mail.uid('fetch', build_message_set(chunk), query)
+        if status != 'OK':
+            continue
+        results.update(parse_fetch_response(data))
+    return results
+
+
+def uid_search(mail, criteria):
+    """Run UID SEARCH and return the matching UIDs as strings in ascending order"""
+    status, messages = mail.uid('search', None, criteria)
+    if status != 'OK' or not messages or not messages[0]:
+        return []
+    return [uid.decode() for uid in messages[0].split()]
+
+
+def fetch_raw_messages(mail, uids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Fetch whole messages for `uids` without setting \\Seen; returns {uid: raw_bytes}"""
+    fetched = uid_fetch(mail, uids, '(UID BODY.PEEK[])', chunk_size)
+    return {uid: items['BODY[]'] for uid, items in fetched.items() if 'BODY[]' in items}
+
+
+def parse_bodystructure(text):
+    """Parse the BODYSTRUCTURE item out of a FETCH response into nested lists
+
+    Quoted strings become str, NIL becomes None. Returns None if the item is
+    missing or cannot be parsed (e.g. a literal inside the structure).
+    """
+    start = text.upper().find(b'BODYSTRUCTURE (')
+    if start < 0:
+        return None
+    pos = start + len(b'BODYSTRUCTURE ')
+    stack = [[]]
+    while True:
+        match = _STRUCTURE_TOKEN.match(text, pos)
+        if not match:
+            return None
+        pos = match.end()
+        if match.group(1):
+            stack.append([])
+        elif match.group(2):
+            if len(stack) == 1:
+                return None
+            node = stack.pop()
+            stack[-1].append(node)
+            if len(stack) == 1:
+                return node
+        elif match.group(3) is not None:
+            value = re.sub(rb'\\(.)', rb'\1', match.group(3))
+            stack[-1].append(value.decode('utf-8', errors='ignore'))
+        else:
+            atom = match.group(4).decode('ascii', errors='ignore')
+            stack[-1].append(None if atom.upper() == 'NIL' else atom)
+
+
+def find_text_part(structure, section=''):
+    """Locate the first text/plain part in a parsed BODYSTRUCTURE
+
+    Returns (section, transfer_encoding) or None. Like the full-message
+    walk, a single-part message uses its only body whatever its type.
+    """
+    if not structure:
+        return None
+    if isinstance(structure[0], list):
+        number = 0
+        for part in structure:
+            if not isinstance(part, list):
+                break
+            number += 1
+            found = find_text_part(part, f"{section}.{number}" if section else str(number))
+            if found:
+                return found
+        return None
+    if not section:
+        return '1', structure[5] if len(structure) > 5 else None
+    if str(structure[0]).lower() == 'text' and str(structure[1]).lower() == 'plain':
+        return section, structure[5] if len(structure) > 5 else None
+    return None
+
+
+def decode_part(data, encoding):
+    """Decode a (possibly truncated) body section to text"""
+    encoding = (encoding or '7bit').lower()
+    try:
+        if encoding == 'base64':
+            data = re.sub(rb'[^A-Za-z0-9+/=]', b'', data)
+            data = base64.b64decode(data[:len(data) // 4 * 4])
+        elif encoding == 'quoted-printable':
+            # Drop an escape sequence cut in half by the byte range
+            data = quopri.decodestring(re.sub(rb'=[0-9A-Fa-f]?$', b'', data))
+    except (binascii.Error, ValueError):
+        return ''
+    return data.decode('utf-8', errors='ignore')
+
+
+def extract_text_body(msg):
+    """Return the first text/plain body of a parsed message"""
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            if content_type == "text/plain":
+                try:
+                    body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+                    break
+                except:
+                    pass
+    else:
+        try:
+            body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
+        except:
+            pass
+    return body
+
+
+def fetch_full_messages(mail, uids, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Fetch whole messages without setting \\Seen; returns {uid: (message, body_text)}"""
+    results = {}
+    for uid, raw_email in fetch_raw_messages(mail, uids, chunk_size).items():
+        msg = email.message_from_bytes(raw_email)
+        results[uid] = (msg, extract_text_body(msg))
+    return results
+
+
+def fetch_partial_messages(mail, uids, chunk_size=DEFAULT_CHUNK_SIZE, max_bytes=DEFAULT_PREVIEW_BYTES):
+    """Fetch headers and the first `max_bytes` of the text part; returns {uid: (headers, body_text)}
+
+    Pass 1 pulls BODYSTRUCTURE plus the header fields we display. Pass 2
+    groups UIDs by the section holding their text part and peeks at a byte
+    range of it, so attachments are never downloaded and \\Seen is not set.
+    Messages whose structure cannot be parsed fall back to a full fetch,
+    which also peeks.
+    """
+    query = f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])'
+    headers = {}
+    sections = {}
+    encodings = {}
+    fallback = []
+    for uid, items in uid_fetch(mail, uids, query, chunk_size).items():
+        header_bytes = next((v for k, v in items.items() if k.startswith('BODY[HEADER')), b'')
+        headers[uid] = email.message_from_bytes(header_bytes)
+        structure = parse_bodystructure(items['_TEXT'])
+        if structure is None:
+            fallback.append(uid)
+            continue
+        text_part = find_text_part(structure)
+        if text_part:
+            section, encodings[uid] = text_part
+            sections.setdefault(section, []).append(uid)
+
+    results = {uid: (msg, '') for uid, msg in headers.items()}
+    for section, section_uids in sections.items():
+        query = f'(UID BODY.PEEK[{section}]<0.{max_bytes}>)'
+        for uid, items in uid_fetch(mail, section_uids, query, chunk_size).items():
+            data = items.get(f'BODY[{section}]')
+            if data is not None and uid in headers:
+                results[uid] = (headers[uid], decode_part(data, encodings[uid]))
+
+    if fallback:
+        results.update(fetch_full_messages(mail, fallback, chunk_size))
+    return results
+
+
+def fetch_messages(mail, uids, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial', max_bytes=DEFAULT_PREVIEW_BYTES):
+    """Fetch `uids` with the given strategy ('partial' or 'full'); returns {uid: (headers, body_text)}"""
+    if strategy == 'full':
+        return fetch_full_messages(mail, uids, chunk_size)
+    return fetch_partial_messages(mail, uids, chunk_size, max_bytes)
+
+
+def quote_mailbox(name):
+    """Quote a mailbox name for SELECT/STATUS (e.g. "[Gmail]/Sent Mail")"""
+    if name.startswith('"'):
+        return name
+    return '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def get_uidvalidity(mail, mailbox='INBOX'):
+    """Return the selected mailbox's UIDVALIDITY as a string (None if unknown)"""
+    typ, data = mail.response('UIDVALIDITY')
+    if data and data[-1]:
+        return data[-1].decode()
+    status, data = mail.status(mailbox, '(UIDVALIDITY)')
+    if status == 'OK' and data and data[0]:
+        match = re.search(rb'UIDVALIDITY (\d+)', data[0])
+        if match:
+            return match.group(1).decode()
+    return None
+
+
+def _is_mailbox_change(line):
+    return bool(re.match(rb'^\* \d+ (EXISTS|EXPUNGE)', line))
+
+
+def _has_unread_input(mail):
+    """Whether mail.readline() has bytes to return without waiting
+
+    imaplib reads through a buffered file, so a line that arrived together
+    with an earlier one sits in that buffer where select() can't see it.
+    Peeking with the socket briefly non-blocking checks the buffer, TLS
+    records and the kernel at once.
+    """
+    timeout = mail.sock.gettimeout()
+    mail.sock.settimeout(0)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+
+def idle_wait(mail, timeout, stop_event=None, poll=1.0):
+    """Issue IMAP IDLE (RFC 2177) and block until the mailbox changes or `timeout` elapses
+
+    Returns True if an EXISTS/EXPUNGE notification arrived. imaplib has no
+    IDLE support, so the command is driven by hand on the session socket.
+    Raises mail.abort if the server refuses IDLE or the connection drops.
+    """
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    line = mail.readline()
+    while line.startswith(b'* '):
+        line = mail.readline()
+    if not line.startswith(b'+'):
+        raise mail.abort(f"IDLE rejected: {line!r}")
+
+    changed = False
+    deadline = time.monotonic() + timeout
+    while not changed and time.monotonic() < deadline:
+        if stop_event is not None and stop_event.is_set():
+            break
+        wait = min(poll, max(0.0, deadline - time.monotonic()))
+        if not _has_unread_input(mail) and not select.select([mail.sock], [], [], wait)[0]:
+            continue
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed during IDLE")
+        changed = _is_mailbox_change(line)
+
+    mail.send(b'DONE\r\n')
+    while True:
+        line = mail.readline()
+        if not line:
+            raise mail.abort("connection closed while ending IDLE")
+        if line.startswith(tag):
+            break
+        changed = changed or _is_mailbox_change(line)
+    return changed
+
+
+def noop_wait(mail, interval, stop_event=None):
+    """Polling fallback for servers without IDLE: sleep, then NOOP and report mailbox changes"""
+    if stop_event is not None:
+        stop_event.wait(interval)
+    else:
+        time.sleep(interval)
+    mail.noop()
+    exists = mail.response('EXISTS')[1]
+    expunge = mail.response('EXPUNGE')[1]
+    return bool((exists and exists[-1]) or (expunge and expunge[-1]))
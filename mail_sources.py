@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Mail sources - Pluggable backends the dashboard fetches from
+
+Every source exposes the same small interface: `uidvalidity`, `search()`
+returning ascending UIDs, `fetch()` returning {uid: (headers, body_text)}
+and `close()`. ImapSource talks to a server (Gmail, or the local stand-in
+in fake_imap_server.py); MaildirSource and MboxSource read local corpora
+so the pipeline can be run and benchmarked offline.
+"""
+
+import email
+import email.utils
+import imaplib
+import mailbox
+import os
+from email.parser import BytesHeaderParser
+
+from mail_fetch import (DEFAULT_CHUNK_SIZE, uid_search, fetch_messages, fetch_raw_messages, get_uidvalidity,
+                        quote_mailbox, extract_text_body)
+
+
+class MailSource:
+    """Base class for mail sources"""
+
+    # Local sources return None, which disables incremental sync and the message store
+    uidvalidity = None
+
+    def search(self, since=None, after_uid=None):
+        """Return UIDs (strings, ascending) of messages dated on/after `since` and above `after_uid`"""
+        raise NotImplementedError
+
+    def fetch(self, uids, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial'):
+        """Return {uid: (headers, body_text)} for `uids`"""
+        raise NotImplementedError
+
+    def fetch_raw(self, uids, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Return {uid: raw_bytes} for `uids`, leaving all MIME parsing to the caller"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ImapSource(MailSource):
+    """One folder of an IMAP account, over a single connection"""
+
+    def __init__(self, host, port, address, app_password, folder='inbox', ssl=True):
+        self.mail = imaplib.IMAP4_SSL(host, port) if ssl else imaplib.IMAP4(host, port)
+        self.mail.login(address, app_password)
+        self.mail.select(quote_mailbox(folder))
+        self.uidvalidity = get_uidvalidity(self.mail, quote_mailbox(folder))
+
+    def search(self, since=None, after_uid=None):
+        criteria = [f'SINCE "{since.strftime("%d-%b-%Y")}"'] if since else ['ALL']
+        if after_uid:
+            criteria.insert(0, f'UID {after_uid + 1}:*')
+        uids = uid_search(self.mail, f'({" ".join(criteria)})')
+        if after_uid:
+            # "UID n:*" always matches the highest UID, even when it is below n
+            uids = [uid for uid in uids if int(uid) > after_uid]
+        return uids
+
+    def fetch(self, uids, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial'):
+        return fetch_messages(self.mail, uids, chunk_size, strategy)
+
+    def fetch_raw(self, uids, chunk_size=DEFAULT_CHUNK_SIZE):
+        return fetch_raw_messages(self.mail, uids, chunk_size)
+
+    def close(self):
+        try:
+            self.mail.logout()
+        except Exception:
+            pass
+
+
+class LocalSource(MailSource):
+    """Shared logic for on-disk mailboxes; UIDs are 1-based positions in delivery order"""
+
+    def __init__(self, box, keys):
+        self.box = box
+        self.keys = keys
+
+    def _message(self, uid):
+        return email.message_from_bytes(self.box.get_bytes(self.keys[int(uid) - 1]))
+
+    def search(self, since=None, after_uid=None):
+        uids = []
+        parser = BytesHeaderParser()
+        for uid in range((after_uid or 0) + 1, len(self.keys) + 1):
+            if since:
+                msg = parser.parsebytes(self.box.get_bytes(self.keys[uid - 1]))
+                try:
+                    if email.utils.parsedate_to_datetime(msg['Date']).date() < since:
+                        continue
+                except (TypeError, ValueError):
+                    pass
+            uids.append(str(uid))
+        return uids
+
+    def fetch(self, uids, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial'):
+        results = {}
+        for uid in uids:
+            if 0 < int(uid) <= len(self.keys):
+                msg = self._message(uid)
+                results[str(uid)] = (msg, extract_text_body(msg))
+        return results
+
+    def fetch_raw(self, uids, chunk_size=DEFAULT_CHUNK_SIZE):
+        return {str(uid): self.box.get_bytes(self.keys[int(uid) - 1])
+                for uid in uids if 0 < int(uid) <= len(self.keys)}
+
+    def close(self):
+        self.box.close()
+
+
+class MaildirSource(LocalSource):
+    """A maildir directory (cur/new/tmp)"""
+
+    def __init__(self, path):
+        box = mailbox.Maildir(path, factory=None, create=False)
+        # Maildir names start with the delivery timestamp, so sorting them
+        # approximates delivery order
+        super().__init__(box, sorted(box.keys()))
+
+
+class MboxSource(LocalSource):
+    """A single mbox file"""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        box = mailbox.mbox(path, create=False)
+        super().__init__(box, sorted(box.keys()))
+
+
+def open_source(config):
+    """Open the source described by a mailbox config (see pipeline.get_mailbox_configs)"""
+    source_type = config.get('type', 'imap')
+    if source_type == 'imap':
+        return ImapSource(config['host'], config['port'], config['address'], config['app_password'],
+                          config.get('folder', 'inbox'), config.get('ssl', True))
+    if source_type == 'maildir':
+        return MaildirSource(config['path'])
+    if source_type == 'mbox':
+        return MboxSource(config['path'])
+    raise ValueError(f"Unknown mail source type: {source_type}")
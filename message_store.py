@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Local message store - SQLite cache of parsed and analyzed messages
+
+Rows are keyed by (mailbox, UIDVALIDITY, UID) so a refresh can look up
+messages it has already seen before fetching them; the Message-ID is
+kept alongside the parsed headers.
+
+Each row records the analyzer version (see analysis_cache.py) it was
+analyzed under; rows from another version are treated as missing, so a
+rule or extraction change re-analyzes stored mail on the next refresh.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from analysis_cache import analyzer_version
+
+MESSAGE_STORE_PATH = '/root/.openclaw/workspace/email-dashboard/.messages.db'
+
+# Default eviction policy applied after each dashboard run
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_COUNT = 5000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS messages (
+    mailbox TEXT NOT NULL,
+    uidvalidity TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    message_id TEXT,
+    headers TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    category TEXT NOT NULL,
+    tasks TEXT NOT NULL,
+    events TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    version TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (mailbox, uidvalidity, uid)
+);
+CREATE INDEX IF NOT EXISTS messages_last_seen ON messages (last_seen);
+'''
+
+
+class MessageStore:
+    """SQLite-backed store of analyzed emails, safe to share between fetch threads"""
+
+    def __init__(self, path=MESSAGE_STORE_PATH, version=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.version = version or analyzer_version()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(messages)')]
+        if 'version' not in columns:
+            # Stores from before versioning: every row counts as stale
+            self.conn.execute("ALTER TABLE messages ADD COLUMN version TEXT NOT NULL DEFAULT ''")
+            self.conn.commit()
+        self.lock = threading.RLock()
+
+    def get_many(self, mailbox, uidvalidity, uids):
+        """Return {uid: email_dict} for the stored, current-version subset of `uids` and mark them as seen"""
+        with self.lock:
+            if not uids or uidvalidity is None:
+                return {}
+            found = {}
+            for start in range(0, len(uids), 500):
+                chunk = [int(uid) for uid in uids[start:start + 500]]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f'SELECT uid, data FROM messages WHERE mailbox = ? AND uidvalidity = ? AND version = ? '
+                    f'AND uid IN ({placeholders})',
+                    [mailbox, uidvalidity, self.version] + chunk,
+                )
+                for uid, data in rows:
+                    found[str(uid)] = json.loads(data)
+            if found:
+                placeholders = ','.join('?' * len(found))
+                self.conn.execute(
+                    f'UPDATE messages SET last_seen = ? WHERE mailbox = ? AND uidvalidity = ? AND uid IN ({placeholders})',
+                    [time.time(), mailbox, uidvalidity] + [int(uid) for uid in found],
+                )
+                self.conn.commit()
+            return found
+
+    def put(self, mailbox, uidvalidity, uid, msg, body, email_data):
+        """Store one analyzed message (`msg` is the parsed header block)"""
+        with self.lock:
+            if uidvalidity is None:
+                return
+            now = time.time()
+            headers = {key: str(value) for key, value in msg.items()}
+            self.conn.execute(
+                'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    mailbox, uidvalidity, int(uid), (msg['Message-ID'] or '').strip() or None,
+                    json.dumps(headers), email_data['subject'], body, email_data['category'],
+                    json.dumps(email_data['tasks']), json.dumps(email_data['events']),
+                    json.dumps(email_data), now, now, self.version,
+                ),
+            )
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def evict(self, max_age_days=DEFAULT_MAX_AGE_DAYS, max_count=DEFAULT_MAX_COUNT):
+        """Drop messages not seen for `max_age_days` and keep at most `max_count` rows"""
+        with self.lock:
+            removed = 0
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self.conn.execute('DELETE FROM messages WHERE last_seen < ?', (cutoff,)).rowcount
+            if max_count is not None:
+                removed += self.conn.execute(
+                    'DELETE FROM messages WHERE rowid NOT IN '
+                    '(SELECT rowid FROM messages ORDER BY last_seen DESC, uid DESC LIMIT ?)',
+                    (max_count,),
+                ).rowcount
+            self.conn.commit()
+            return removed
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
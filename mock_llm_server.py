@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Local LLM stand-in - Answers Messages-API style requests with canned summaries
+
+Simulates what matters when testing summarization throughput offline:
+per-request latency, a server-side requests-per-second limit answered with
+429 and Retry-After, random 429s and random 503s (an unhealthy API).
+Batched prompts (emails introduced by "ID: ...") get a JSON object of
+summaries by ID, optionally leaving some IDs out at random. It
+speaks keep-alive HTTP/1.1 and counts connections, requests, error responses
+and the peak number of requests in flight:
+
+    python3 mock_llm_server.py --port 8089 --latency 0.5 --rate-limit 5
+    KIMI_API_URL=http://127.0.0.1:8089/v1/messages python3 summarize_with_ai.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_SUBJECT_RE = re.compile(r'^Subject: (.*)$', re.MULTILINE)
+_BATCH_RE = re.compile(r'^ID: (\S+)\nSubject: (.*)$', re.MULTILINE)
+
+
+class MockLlmServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering POSTs after `latency` (+ up to `jitter`) seconds"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0.5, jitter=0.0, rate_limit=None, error_rate=0.0, retry_after=1, seed=0,
+                 failure_rate=0.0, drop_rate=0.0):
+        super().__init__(address, _LlmHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.connections = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/v1/messages"
+
+    def connected(self):
+        with self.lock:
+            self.connections += 1
+
+    def admit(self):
+        """Count a request; returns the HTTP status to answer it with (200 means serve it)"""
+        with self.lock:
+            self.requests += 1
+            if self.rng.random() < self.failure_rate:
+                self.failed += 1
+                return 503
+            now = time.monotonic()
+            while self.recent and self.recent[0] <= now - 1:
+                self.recent.popleft()
+            if (self.rate_limit and len(self.recent) >= self.rate_limit) or self.rng.random() < self.error_rate:
+                self.rate_limited += 1
+                return 429
+            self.recent.append(now)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return 200
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def drop(self):
+        """Whether to leave one email out of a batched reply"""
+        with self.lock:
+            return self.rng.random() < self.drop_rate
+
+    def delay(self):
+        with self.lock:
+            return self.latency + self.rng.uniform(0, self.jitter)
+
+    def stats(self):
+        with self.lock:
+            return {'connections': self.connections, 'requests': self.requests, 'rate_limited': self.rate_limited,
+                    'failed': self.failed, 'peak_in_flight': self.peak_in_flight}
+
+    def start(self):
+        """Serve on a background thread; returns the thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def mock_reply(prompt, drop=None):
+    """Stand-in for a model's answer to `prompt`; drop() decides which batched emails to leave out"""
+    batch = _BATCH_RE.findall(prompt)
+    if batch:
+        return json.dumps({email_id: f"Mock summary of \"{subject.strip()}\"." for email_id, subject in batch
+                           if not (drop and drop())})
+    subjects = _SUBJECT_RE.findall(prompt)
+    if len(subjects) == 1:
+        return f"Mock summary of \"{subjects[0].strip()}\"."
+    if subjects:
+        return f"Mock summary of {len(subjects)} emails."
+    notes = [line for line in prompt.splitlines() if line.startswith('- ')]
+    return f"Mock summary of {len(notes)} notes ({notes[0][2:40] if notes else 'none'})."
+
+
+class _LlmHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connected()
+
+    def respond(self, status, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        status = self.server.admit()
+        if status == 503:
+            self.respond(503, {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}})
+            return
+        if status == 429:
+            self.respond(429, {'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'Too many requests'}},
+                         [('Retry-After', str(self.server.retry_after))])
+            return
+        try:
+            time.sleep(self.server.delay())
+            prompt = request.get('messages', [{}])[-1].get('content', '')
+            self.respond(200, {
+                'type': 'message',
+                'role': 'assistant',
+                'content': [{'type': 'text', 'text': mock_reply(prompt, self.server.drop)}]
+            })
+        finally:
+            self.server.done()
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a mock LLM messages endpoint with latency and 429s")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument('--rate-limit', type=int, help="requests per second before answering 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered 429 at random")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of requests answered 503 at random")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="fraction of emails left out of batched replies")
+    parser.add_argument('--retry-after', default='1', help="Retry-After value sent with 429s")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockLlmServer(('127.0.0.1', args.port), args.latency, args.jitter, args.rate_limit,
+                           args.error_rate, args.retry_after, args.seed, args.failure_rate,
+                           args.drop_rate)
+    print(f"Mock LLM on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats()))
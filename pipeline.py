@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Analysis pipeline - The fetch -> decode -> analyze -> aggregate -> serialize stages
+
+Both update_dashboard.py and api_server.py build their data through these
+functions, so the dashboard file and the API always agree and an
+optimization only has to be made once. Every stage records its wall time,
+message count and the bytes of text it handled into a PipelineStats; the
+report shows where a refresh actually spends its time.
+"""
+
+import os
+import email
+import email.utils
+from email.header import decode_header
+from datetime import datetime, timedelta
+import json
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+
+from atomic_io import atomic_write
+from mail_fetch import DEFAULT_CHUNK_SIZE, extract_text_body
+from mail_sources import open_source
+from sync_state import resume_uid, advance
+from batch_classify import classify_batch
+from task_extractor import extract_tasks
+from task_dedup import cluster_tasks
+from thread_index import parse_message_ids, thread_refs, group_conversations
+from rolling_aggregates import RollingAggregates
+from time_index import parse_timestamp, email_timestamp
+
+DATA_PATH = '/root/.openclaw/workspace/email-dashboard/data.json'
+ACCOUNTS_CONFIG_PATH = os.environ.get('EMAIL_DASHBOARD_ACCOUNTS', '/root/.openclaw/workspace/.email_accounts.json')
+DEFAULT_FOLDERS = ['inbox']
+# Upper bound on concurrent IMAP connections (one per account/folder)
+DEFAULT_FETCH_WORKERS = 4
+# Body text kept per message for analysis, previews and the store
+MAX_BODY_CHARS = 1000
+# Deduplicated tasks shown on the dashboard
+MAX_DASHBOARD_TASKS = 10
+# Entries per list in the dashboard's analytics section
+MAX_ANALYTICS_ITEMS = 10
+# Backfill: process-pool size and messages per dispatched chunk (large enough
+# for batch classification to pay off, small enough to balance across workers)
+DEFAULT_BACKFILL_WORKERS = os.cpu_count() or 1
+BACKFILL_DISPATCH_SIZE = 250
+
+STAGES = ['fetch', 'decode', 'analyze', 'aggregate', 'serialize']
+
+class PipelineStats:
+    """Per-stage wall time, message count and bytes, accumulated across runs and threads
+    
+    Mailboxes are fetched concurrently, so a stage's seconds are summed
+    over threads and can exceed the wall time of the whole refresh. Named
+    counters (e.g. date_parse_failures) are kept alongside in `metrics`.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {name: {'seconds': 0.0, 'messages': 0, 'bytes': 0} for name in STAGES}
+        self.metrics = {}
+    
+    def incr(self, metric, amount=1):
+        with self.lock:
+            self.metrics[metric] = self.metrics.get(metric, 0) + amount
+    
+    def record(self, name, seconds, messages=0, nbytes=0):
+        with self.lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'messages': 0, 'bytes': 0})
+            entry['seconds'] += seconds
+            entry['messages'] += messages
+            entry['bytes'] += nbytes
+    
+    @contextmanager
+    def stage(self, name):
+        """Time a block; set 'messages' and 'bytes' on the yielded dict to record counts"""
+        counts = {'messages': 0, 'bytes': 0}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(name, time.perf_counter() - start, counts['messages'], counts['bytes'])
+    
+    def merge(self, stages, metrics=None):
+        """Add another run's as_dict() and metrics_dict() output, e.g. from a worker process"""
+        for name, entry in stages.items():
+            self.record(name, entry['seconds'], entry['messages'], entry['bytes'])
+        for metric, amount in (metrics or {}).items():
+            self.incr(metric, amount)
+    
+    def as_dict(self):
+        with self.lock:
+            return {name: dict(entry, seconds=round(entry['seconds'], 4)) for name, entry in self.stages.items()}
+    
+    def metrics_dict(self):
+        with self.lock:
+            return dict(self.metrics)
+    
+    def report(self):
+        """One line per stage and per metric, for printing after a refresh"""
+        lines = []
+        for name, entry in self.as_dict().items():
+            lines.append(f"  {name:<10} {entry['seconds']:8.3f}s {entry['messages']:>7} msgs "
+                         f"{entry['bytes'] / 1024:>10.1f} KB")
+        for metric, amount in sorted(self.metrics_dict().items()):
+            lines.append(f"  {metric}: {amount}")
+        return "\n".join(lines)
+
+def get_email_config():
+    """Read email credentials from config"""
+    with open('/root/.openclaw/workspace/.email_config', 'r') as f:
+        lines = f.readlines()
+        email_addr = None
+        app_pass = None
+        for line in lines:
+            if 'address' in line:
+                email_addr = line.split('=')[1].strip().strip('"')
+            if 'app_password' in line:
+                app_pass = line.split('=')[1].strip().strip('"')
+        return email_addr, app_pass
+
+def get_mailbox_configs():
+    """List the account/folder pairs to fetch
+    
+    Reads .email_accounts.json (or $EMAIL_DASHBOARD_ACCOUNTS), a list of
+    accounts like {"address": ..., "app_password": ..., "host": "imap.gmail.com",
+    "port": 993, "ssl": true, "folders": ["INBOX", "[Gmail]/Sent Mail"]}, or
+    local sources like {"type": "maildir" | "mbox", "path": ...}.
+    Without it, falls back to the single .email_config account's inbox.
+    """
+    try:
+        with open(ACCOUNTS_CONFIG_PATH, 'r') as f:
+            accounts = json.load(f)
+    except FileNotFoundError:
+        email_addr, app_pass = get_email_config()
+        accounts = [{'address': email_addr, 'app_password': app_pass}]
+    
+    mailboxes = []
+    for account in accounts:
+        source_type = account.get('type', 'imap')
+        if source_type != 'imap':
+            mailboxes.append({'type': source_type, 'path': account['path'],
+                              'label': f"{source_type}:{account['path']}"})
+            continue
+        for folder in account.get('folders') or DEFAULT_FOLDERS:
+            mailboxes.append({
+                'type': 'imap',
+                'address': account['address'],
+                'app_password': account['app_password'],
+                'host': account.get('host', 'imap.gmail.com'),
+                'port': int(account.get('port', 993)),
+                'ssl': account.get('ssl', True),
+                'folder': folder,
+                'label': f"{account['address']}/{folder}"
+            })
+    return mailboxes
+
+def read_source(source, label, limit=20, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial', sync_state=None, store=None, days=7, stats=None, cache=None):
+    """Fetch, decode and analyze the newest `limit` messages of an open mail source
+    
+    If sync_state (a mailbox entry from sync_state.py) is given, only UIDs
+    above its high-water mark are fetched, unless UIDVALIDITY has changed,
+    and the entry is advanced in place. Sources without a UIDVALIDITY
+    (maildir, mbox) are always read in full and leave the entry empty.
+    
+    If store (a message_store.MessageStore) is given, messages already in
+    it are read from disk instead of being fetched and analyzed again.
+    
+    If cache (an analysis_cache.AnalysisCache) is given, fetched messages
+    with already analyzed content reuse the cached analysis.
+    """
+    stats = stats or PipelineStats()
+    if source.uidvalidity is None:
+        # Local sources number messages by position, which shifts as mail is added or removed
+        sync_state = None
+    with stats.stage('fetch') as counts:
+        uidvalidity = source.uidvalidity
+        since = (datetime.now() - timedelta(days=days)).date() if days else None
+        last_uid = resume_uid(sync_state, uidvalidity) if sync_state is not None else None
+        uids = source.search(since, after_uid=last_uid)[-limit:]
+        stored = store.get_many(label, uidvalidity, uids) if store is not None else {}
+        messages = source.fetch([uid for uid in uids if uid not in stored], chunk_size, strategy)
+        counts['messages'] = len(messages)
+        counts['bytes'] = sum(len(body) for _, body in messages.values())
+    
+    fetched = [(uid, *messages[uid]) for uid in reversed(uids) if uid not in stored and uid in messages]
+    analyzed = {}
+    for (uid, msg, body), e in zip(fetched, analyze_emails(decode_messages(fetched, stats), stats, cache)):
+        e['mailbox'] = label
+        if store is not None:
+            store.put(label, uidvalidity, uid, msg, body[:MAX_BODY_CHARS], e)
+        analyzed[uid] = e
+    if store is not None:
+        store.commit()
+    emails = [stored.get(uid) or analyzed[uid] for uid in reversed(uids) if uid in stored or uid in analyzed]
+    
+    if sync_state is not None:
+        advance(sync_state, uidvalidity, list(messages) + list(stored))
+    return emails
+
+def fetch_emails(limit=20, chunk_size=DEFAULT_CHUNK_SIZE, strategy='partial', sync_state=None, store=None, mailbox=None, days=7, stats=None, cache=None):
+    """Fetch emails from one mailbox using batched UID FETCH (chunk_size UIDs per round-trip)
+    
+    mailbox is an entry from get_mailbox_configs(); defaults to the first one.
+    It may be an IMAP folder or a local maildir/mbox (see mail_sources.py).
+    
+    strategy='partial' downloads only headers and the start of the text part;
+    strategy='full' downloads whole messages. Neither marks mail as read.
+    
+    See read_source for sync_state, store and cache.
+    """
+    try:
+        mailbox = mailbox or get_mailbox_configs()[0]
+        with open_source(mailbox) as source:
+            return read_source(source, mailbox['label'], limit, chunk_size, strategy, sync_state, store, days, stats, cache)
+    except Exception as e:
+        print(f"Error fetching emails from {(mailbox or {}).get('label', 'mailbox')}: {e}")
+        return []
+
+def fetch_all_mailboxes(limit=20, max_workers=DEFAULT_FETCH_WORKERS, sync_state=None, store=None, mailboxes=None, stats=None, cache=None):
+    """Fetch every configured account/folder concurrently and merge them newest first
+    
+    Each mailbox gets its own connection on a bounded thread pool. sync_state
+    is the whole state dict from sync_state.py; each mailbox uses the entry
+    under its label.
+    """
+    mailboxes = mailboxes or get_mailbox_configs()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(mailboxes)))) as pool:
+        futures = []
+        for mailbox in mailboxes:
+            mailbox_state = sync_state.setdefault(mailbox['label'], {}) if sync_state is not None else None
+            futures.append(pool.submit(fetch_emails, limit, sync_state=mailbox_state, store=store, mailbox=mailbox,
+                                       stats=stats, cache=cache))
+        emails = [e for future in futures for e in future.result()]
+    return sort_by_date(dedupe_emails(emails))[:limit]
+
+def _backfill_chunk(chunk):
+    """Process-pool worker: parse, decode and analyze [(uid, raw_bytes)]; returns (emails, stage timings, metrics)"""
+    stats = PipelineStats()
+    start = time.perf_counter()
+    fetched = []
+    for uid, raw in chunk:
+        msg = email.message_from_bytes(raw)
+        fetched.append((uid, msg, extract_text_body(msg)))
+    # MIME parsing is decode work; decode_messages below counts the messages
+    stats.record('decode', time.perf_counter() - start)
+    return analyze_emails(decode_messages(fetched, stats), stats), stats.as_dict(), stats.metrics_dict()
+
+def backfill_mailbox(limit, mailbox=None, days=None, workers=DEFAULT_BACKFILL_WORKERS, chunk_size=DEFAULT_CHUNK_SIZE, stats=None):
+    """Fetch up to `limit` raw messages and decode/analyze them on a process pool
+    
+    For large backfills, where MIME parsing and task extraction would
+    otherwise run serially on one core. Raw messages are dispatched in
+    chunks of BACKFILL_DISPATCH_SIZE as soon as they arrive, so workers run
+    while the next chunk is still downloading; results are reassembled in
+    mailbox order (newest first). Backfilled mail bypasses the message store
+    and analysis cache.
+    """
+    stats = stats or PipelineStats()
+    try:
+        mailbox = mailbox or get_mailbox_configs()[0]
+        with open_source(mailbox) as source, \
+                ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            with stats.stage('fetch'):
+                since = (datetime.now() - timedelta(days=days)).date() if days else None
+                uids = source.search(since)[-limit:][::-1]
+            futures = []
+            for start in range(0, len(uids), BACKFILL_DISPATCH_SIZE):
+                chunk_uids = uids[start:start + BACKFILL_DISPATCH_SIZE]
+                with stats.stage('fetch') as counts:
+                    raw = source.fetch_raw(chunk_uids, chunk_size)
+                    counts['messages'] = len(raw)
+                    counts['bytes'] = sum(len(data) for data in raw.values())
+                futures.append(pool.submit(_backfill_chunk, [(uid, raw[uid]) for uid in chunk_uids if uid in raw]))
+            emails = []
+            for future in futures:
+                chunk_emails, chunk_stats, chunk_metrics = future.result()
+                stats.merge(chunk_stats, chunk_metrics)
+                emails.extend(chunk_emails)
+        for e in emails:
+            e['mailbox'] = mailbox['label']
+        return emails
+    except Exception as e:
+        print(f"Error backfilling {(mailbox or {}).get('label', 'mailbox')}: {e}")
+        return []
+
+def backfill_all_mailboxes(limit, days=None, workers=DEFAULT_BACKFILL_WORKERS, stats=None, mailboxes=None):
+    """Backfill every configured account/folder in turn (each one uses the whole pool) and merge newest first"""
+    emails = []
+    for mailbox in mailboxes or get_mailbox_configs():
+        emails.extend(backfill_mailbox(limit, mailbox, days, workers, stats=stats))
+    return sort_by_date(dedupe_emails(emails))[:limit]
+
+def decode_subject(msg):
+    """Decode a possibly RFC 2047 encoded Subject header"""
+    subject = ""
+    if msg['Subject']:
+        decoded = decode_header(msg['Subject'])
+        for part, charset in decoded:
+            if isinstance(part, bytes):
+                subject += part.decode(charset or 'utf-8', errors='ignore')
+            else:
+                subject += part
+    return subject
+
+def decode_messages(fetched, stats=None):
+    """Decode stage: turn [(uid, headers, body)] into plain header fields and truncated body text
+    
+    The Date header is parsed here, once, into an epoch 'timestamp' (None
+    when unparseable, counted in the date_parse_failures metric).
+    """
+    stats = stats or PipelineStats()
+    with stats.stage('decode') as counts:
+        decoded = []
+        for uid, msg, body in fetched:
+            from_addr = msg['From'] or "Unknown"
+            sender_name = from_addr.split('<')[0].strip() if '<' in from_addr else from_addr
+            if len(sender_name) > 30:
+                sender_name = sender_name[:27] + '...'
+            address = email.utils.parseaddr(from_addr)[1]
+            message_ids = parse_message_ids(msg['Message-ID'])
+            timestamp = parse_timestamp(msg['Date'])
+            if timestamp is None:
+                stats.incr('date_parse_failures')
+            decoded.append({
+                'id': uid,
+                'subject': decode_subject(msg),
+                'from': sender_name,
+                'sender_domain': address.rpartition('@')[2].lower() if '@' in address else None,
+                'date': msg['Date'] or "Unknown",
+                'timestamp': timestamp,
+                'message_id': message_ids[0] if message_ids else None,
+                'thread_refs': thread_refs(msg),
+                'body': body[:MAX_BODY_CHARS]
+            })
+            counts['bytes'] += len(body)
+        counts['messages'] = len(decoded)
+    return decoded
+
+def analyze_messages(decoded):
+    """Return [{category, category_confidence, tasks, events}] for decoded messages, scoring categories and events as one batch"""
+    classified = classify_batch([(d['subject'], d['body']) for d in decoded])
+    return [{'category': category, 'category_confidence': confidence,
+             'tasks': extract_tasks(d['body'], d['subject']), 'events': events}
+            for d, (category, confidence, events) in zip(decoded, classified)]
+
+def analyze_emails(decoded, stats=None, cache=None):
+    """Analyze stage: categorize and extract tasks/events
+    
+    With cache (an analysis_cache.AnalysisCache) only messages whose content
+    hash is not cached yet are analyzed.
+    """
+    with (stats or PipelineStats()).stage('analyze') as counts:
+        if cache is not None:
+            keys = [cache.key(d['subject'], d['body']) for d in decoded]
+            analyses = cache.get_many(keys)
+            missing = [i for i, key in enumerate(keys) if key not in analyses]
+            fresh = dict(zip([keys[i] for i in missing], analyze_messages([decoded[i] for i in missing])))
+            cache.put_many(fresh)
+            analyses.update(fresh)
+            analyses = [analyses[key] for key in keys]
+        else:
+            analyses = analyze_messages(decoded)
+        
+        results = []
+        for d, analysis in zip(decoded, analyses):
+            subject, body = d['subject'], d['body']
+            results.append({
+                'id': d['id'],
+                'subject': subject[:80] + ('...' if len(subject) > 80 else ''),
+                'from': d['from'],
+                'sender_domain': d['sender_domain'],
+                'date': d['date'],
+                'timestamp': d['timestamp'],
+                'message_id': d['message_id'],
+                'thread_refs': d['thread_refs'],
+                'category': analysis['category'],
+                'category_confidence': analysis['category_confidence'],
+                'tasks': list(analysis['tasks']),
+                'events': [dict(event) for event in analysis['events']],
+                'preview': body[:150].replace('\n', ' ').strip() + '...' if body else ''
+            })
+            counts['bytes'] += len(subject) + len(body)
+        counts['messages'] = len(results)
+    return results
+
+def sort_by_date(emails):
+    """Sort emails newest first; undated mail keeps its relative order at the end"""
+    return sorted(emails, key=lambda e: email_timestamp(e) if email_timestamp(e) is not None else float('-inf'),
+                  reverse=True)
+
+def email_key(e):
+    """Identity of a message across mailboxes: its Message-ID, else (mailbox, UID)"""
+    return e.get('message_id') or (e.get('mailbox'), e['id'])
+
+def dedupe_emails(emails):
+    """Drop repeats of a message (e.g. a Gmail message in INBOX and under a label), keeping the first"""
+    seen = set()
+    unique = []
+    for e in emails:
+        key = email_key(e)
+        if key not in seen:
+            seen.add(key)
+            unique.append(e)
+    return unique
+
+def merge_emails(new_emails, old_emails, limit=20, days=7):
+    """Merge newly fetched emails with previous ones, dropping duplicates and expired mail"""
+    cutoff = time.time() - days * 86400
+    merged = []
+    for e in dedupe_emails(new_emails + old_emails):
+        sent = email_timestamp(e)
+        if sent is not None and sent < cutoff:
+            continue
+        merged.append(e)
+    return sort_by_date(merged)[:limit]
+
+def format_summary(totals):
+    """Render TL;DR text from email/sender/category/task totals"""
+    if not totals['emails']:
+        return "No new emails in the last hour."
+    
+    # Get top senders (a bounded heap, not a sort of every sender)
+    top_senders = heapq.nlargest(3, totals['senders'].items(), key=lambda x: x[1])
+    cat_counts = totals['categories']
+    
+    # Build summary
+    summary_parts = []
+    summary_parts.append(f"📧 {totals['emails']} new email{'s' if totals['emails'] > 1 else ''}")
+    
+    # Add sender info
+    if top_senders:
+        sender_str = ", ".join([f"{count} from {sender}" for sender, count in top_senders])
+        summary_parts.append(f"Top: {sender_str}")
+    
+    # Add category breakdown
+    if cat_counts:
+        cat_str = ", ".join([f"{count} {cat}" for cat, count in sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:3]])
+        summary_parts.append(f"Categories: {cat_str}")
+    
+    # Add task count
+    if totals['tasks']:
+        summary_parts.append(f"⚡ {totals['tasks']} task{'s' if totals['tasks'] > 1 else ''} detected")
+    
+    return " | ".join(summary_parts)
+
+def ingest_aggregates(aggregates, emails):
+    """Count emails into rolling aggregates; ones already counted are skipped"""
+    for e in emails:
+        aggregates.ingest(e, email_timestamp(e))
+
+def generate_bullet_summary(emails):
+    """Generate bullet-pointed summary of email contents"""
+    if not emails:
+        return []
+    
+    bullets = []
+    
+    for e in emails[:10]:  # Summarize top 10 emails
+        subject = e['subject']
+        body = e.get('body', '')[:500]  # First 500 chars
+        sender = e['from']
+        
+        # Generate a one-line summary based on email type
+        summary = ""
+        
+        # Check for common patterns
+        subject_lower = subject.lower()
+        
+        if any(word in subject_lower for word in ['failed', 'error', 'issue', 'problem', 'alert']):
+            summary = f"⚠️ **{sender}**: Issue detected - {subject}"
+        elif any(word in subject_lower for word in ['success', 'completed', 'done', 'confirmed']):
+            summary = f"✅ **{sender}**: Completed successfully - {subject}"
+        elif any(word in subject_lower for word in ['welcome', 'new', 'joined', 'created']):
+            summary = f"🎉 **{sender}**: New account/setup - {subject}"
+        elif any(word in subject_lower for word in ['sign in', 'login', 'access', 'security']):
+            summary = f"🔐 **{sender}**: Security/Access activity - {subject}"
+        elif any(word in subject_lower for word in ['invoice', 'payment', 'bill', 'receipt']):
+            summary = f"💰 **{sender}**: Financial document - {subject}"
+        elif any(word in subject_lower for word in ['meeting', 'call', 'zoom', 'calendar']):
+            summary = f"📅 **{sender}**: Meeting/Call related - {subject}"
+        elif any(word in subject_lower for word in ['update', 'newsletter', 'digest']):
+            summary = f"📰 **{sender}**: Newsletter/Update - {subject}"
+        elif e.get('thread_refs') or 're:' in subject_lower or 'fwd:' in subject_lower:
+            summary = f"💬 **{sender}**: Thread reply - {subject}"
+        else:
+            summary = f"📧 **{sender}**: {subject}"
+        
+        bullets.append(summary)
+    
+    return bullets
+
+def build_dashboard_data(emails, stats=None, aggregates=None):
+    """Aggregate stage: summarize analyzed emails into the dashboard data structure
+    
+    aggregates (a rolling_aggregates.RollingAggregates) carries the last-hour
+    and last-7-days counters across runs; emails not counted yet are added
+    to it. Without one the windows only cover `emails`.
+    """
+    with (stats or PipelineStats()).stage('aggregate') as counts:
+        counts['messages'] = len(emails)
+        aggregates = aggregates if aggregates is not None else RollingAggregates()
+        ingest_aggregates(aggregates, emails)
+        return _aggregate(emails, aggregates)
+
+def group_tasks(emails):
+    """Merge near-duplicate tasks across emails (newest first) into [{'task', 'count'}]
+    
+    Each group keeps the wording of its earliest occurrence - the original
+    request rather than a later reminder or quoted reply - and groups are
+    ordered by their most recent occurrence.
+    """
+    tasks = [task for e in reversed(emails) for task in e['tasks']]
+    clusters = sorted(cluster_tasks(tasks), key=lambda members: members[-1], reverse=True)
+    return [{'task': tasks[members[0]], 'count': len(members)} for members in clusters]
+
+def _aggregate(emails, aggregates):
+    categories = {}
+    all_tasks = []
+    all_events = []
+    
+    for e in emails:
+        cat = e['category']
+        categories[cat] = categories.get(cat, 0) + 1
+        all_tasks.extend(e['tasks'])
+        all_events.extend(e['events'])
+    
+    task_groups = group_tasks(emails)[:MAX_DASHBOARD_TASKS]
+    conversations = group_conversations(emails)
+    
+    # Generate summaries from the rolling windows
+    week = aggregates.window('week')
+    hour = aggregates.window('hour')
+    tldr_summary = format_summary(week)
+    hourly_summary = format_summary(hour)
+    bullet_summaries = generate_bullet_summary(emails)
+    analytics = aggregates.analytics(MAX_ANALYTICS_ITEMS)
+    if week['emails'] and analytics['domains']:
+        top_domains = ", ".join(f"{entry['count']} {entry['value']}" for entry in analytics['domains'][:3])
+        tldr_summary += f" | Top domains: {top_domains}"
+    
+    return {
+        'summary': {
+            'total_emails': len(emails),
+            'total_conversations': len(conversations),
+            'categories': categories,
+            'task_count': len(all_tasks),
+            'event_count': len(all_events),
+            'tldr': tldr_summary,
+            'hourly_summary': hourly_summary,
+            'bullet_summary': bullet_summaries,
+            'date_parse_failures': sum(1 for e in emails if email_timestamp(e) is None),
+            'windows': {name: {field: totals[field] for field in ('emails', 'tasks', 'events', 'categories')}
+                        for name, totals in (('hour', hour), ('week', week))}
+        },
+        'emails': emails,
+        'conversations': conversations,
+        'analytics': analytics,
+        'tasks': [group['task'] for group in task_groups],
+        'task_groups': task_groups,
+        'events': all_events,
+        'last_updated': datetime.now().isoformat()
+    }
+
+def serialize_dashboard(data, stats=None, indent=2):
+    """Serialize stage: dashboard data as JSON bytes"""
+    with (stats or PipelineStats()).stage('serialize') as counts:
+        payload = json.dumps(data, indent=indent).encode()
+        counts['messages'] = len(data.get('emails', []))
+        counts['bytes'] = len(payload)
+    return payload
+
+def write_dashboard(data, path=DATA_PATH, stats=None):
+    """Serialize the dashboard data and write it to path atomically"""
+    atomic_write(path, serialize_dashboard(data, stats))
+
+def load_dashboard_data(path=DATA_PATH):
+    """Load the previously written dashboard data, or {} if there is none"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
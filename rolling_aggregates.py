@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Rolling aggregates - Time-bucketed email counters for the summaries
+
+Each window is a ring buffer of fixed-width buckets (60 one-minute buckets
+for the last hour, 168 one-hour buckets for the last 7 days). Every bucket
+holds email, task and event counts plus per-sender and per-category
+counters, and each window keeps running totals. Ingesting a message adds
+it to the current totals; when time moves past a bucket it is subtracted
+and cleared. Reading a window is therefore a lookup of its totals, however
+many messages the mailbox has.
+
+A message is counted once however often it is re-fetched: ingested keys are
+remembered in the 7-day window's bucket they landed in and forgotten when
+it expires.
+Alongside the windows, a heavy_hitters.HeavyHitters tracks the top senders,
+domains and subject words over all mail ever ingested, in fixed memory.
+The whole state can be saved as JSON between dashboard runs.
+"""
+
+import json
+import threading
+import time
+import zlib
+
+from atomic_io import atomic_write
+from heavy_hitters import HeavyHitters
+
+AGGREGATES_PATH = '/root/.openclaw/workspace/email-dashboard/.aggregates.json'
+
+# name: (bucket width in seconds, number of buckets)
+WINDOWS = {
+    'hour': (60, 60),
+    'week': (3600, 168),
+}
+
+
+def _empty_counts():
+    return {'emails': 0, 'tasks': 0, 'events': 0, 'senders': {}, 'categories': {}}
+
+
+def _apply(totals, counts, sign):
+    """Add (sign=1) or subtract (sign=-1) one set of counts into totals"""
+    for field in ('emails', 'tasks', 'events'):
+        totals[field] += sign * counts[field]
+    for field in ('senders', 'categories'):
+        target = totals[field]
+        for key, value in counts[field].items():
+            value = target.get(key, 0) + sign * value
+            if value:
+                target[key] = value
+            else:
+                target.pop(key, None)
+
+
+class RingWindow:
+    """`size` buckets of `width` seconds with running totals over the live ones"""
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self.buckets = [None] * size
+        self.totals = _empty_counts()
+        self.current = None
+
+    def advance(self, now, on_expire=None):
+        """Expire buckets that have fallen out of the window ending at `now`"""
+        current = int(now // self.width)
+        if self.current is not None and current <= self.current:
+            return
+        # Buckets that just expired sit in the slots of the bucket indices we
+        # moved over, so at most one lap of the ring is visited
+        steps = self.size if self.current is None else min(current - self.current, self.size)
+        for index in range(current - steps + 1, current + 1):
+            bucket = self.buckets[index % self.size]
+            if bucket is not None and bucket['index'] <= current - self.size:
+                _apply(self.totals, bucket, -1)
+                if on_expire:
+                    on_expire(bucket)
+                self.buckets[index % self.size] = None
+        self.current = current
+
+    def add(self, timestamp, counts):
+        """Count `counts` in the bucket for `timestamp`; returns the bucket, or None if it is outside the window"""
+        index = int(timestamp // self.width)
+        if self.current is not None and (index <= self.current - self.size or index > self.current):
+            return None
+        slot = index % self.size
+        bucket = self.buckets[slot]
+        if bucket is None or bucket['index'] != index:
+            bucket = self.buckets[slot] = dict(_empty_counts(), index=index, keys=[])
+        _apply(bucket, counts, 1)
+        _apply(self.totals, counts, 1)
+        return bucket
+
+    def to_dict(self):
+        return {'width': self.width, 'size': self.size, 'current': self.current,
+                'buckets': [bucket for bucket in self.buckets if bucket is not None]}
+
+    @classmethod
+    def from_dict(cls, data):
+        window = cls(data['width'], data['size'])
+        window.current = data['current']
+        for bucket in data['buckets']:
+            window.buckets[bucket['index'] % window.size] = bucket
+            _apply(window.totals, bucket, 1)
+        return window
+
+
+class RollingAggregates:
+    """Last-hour and last-7-days counters, updated per ingested email; safe to share between threads"""
+
+    def __init__(self):
+        self.windows = {name: RingWindow(width, size) for name, (width, size) in WINDOWS.items()}
+        self.seen = set()
+        self.heavy_hitters = HeavyHitters()
+        self.lock = threading.RLock()
+
+    def _forget(self, bucket):
+        self.seen.difference_update(bucket['keys'])
+
+    def advance(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            for name, window in self.windows.items():
+                window.advance(now, self._forget if name == 'week' else None)
+
+    def ingest(self, e, timestamp, now=None):
+        """Count one analyzed email sent at `timestamp` (epoch seconds); re-ingesting it is a no-op"""
+        now = time.time() if now is None else now
+        key = e.get('message_id') or f"{e.get('mailbox')}:{e['id']}"
+        counts = {
+            'emails': 1,
+            'tasks': len(e['tasks']),
+            'events': len(e['events']),
+            'senders': {e['from']: 1},
+            'categories': {e['category']: 1},
+        }
+        with self.lock:
+            # Long-term top-k counts include mail older than the windows (and undated mail)
+            self.heavy_hitters.add(e, key)
+            if key in self.seen or timestamp is None:
+                return False
+            self.advance(now)
+            # Clock skew can date mail slightly in the future; count it as now
+            timestamp = min(timestamp, now)
+            week_bucket = self.windows['week'].add(timestamp, counts)
+            if week_bucket is None:
+                return False
+            week_bucket['keys'].append(key)
+            self.seen.add(key)
+            self.windows['hour'].add(timestamp, counts)
+            return True
+
+    def window(self, name, now=None):
+        """Snapshot of the totals for 'hour' or 'week' as of `now`"""
+        with self.lock:
+            self.advance(now)
+            totals = self.windows[name].totals
+            return dict(totals, senders=dict(totals['senders']), categories=dict(totals['categories']))
+
+    def analytics(self, n=10):
+        """Top-n senders, domains and subject words over all ingested mail"""
+        with self.lock:
+            return self.heavy_hitters.snapshot(n)
+
+    def to_dict(self):
+        with self.lock:
+            data = {name: window.to_dict() for name, window in self.windows.items()}
+            data['heavy_hitters'] = self.heavy_hitters.to_dict()
+            return json.loads(json.dumps(data))
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        for name, (width, size) in WINDOWS.items():
+            window = data.get(name)
+            if window and window.get('width') == width and window.get('size') == size:
+                aggregates.windows[name] = RingWindow.from_dict(window)
+        for bucket in aggregates.windows['week'].buckets:
+            if bucket is not None:
+                aggregates.seen.update(bucket['keys'])
+        if data.get('heavy_hitters'):
+            aggregates.heavy_hitters = HeavyHitters.from_dict(data['heavy_hitters'])
+        return aggregates
+
+
+def load_aggregates(path=AGGREGATES_PATH):
+    """Load saved aggregates, or empty ones if missing/corrupt"""
+    try:
+        with open(path, 'r') as f:
+            return RollingAggregates.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError, zlib.error):
+        return RollingAggregates()
+
+
+def save_aggregates(aggregates, path=AGGREGATES_PATH):
+    """Write the aggregates atomically"""
+    atomic_write(path, json.dumps(aggregates.to_dict()).encode())
@@ -71,19 +71,9 @@ def generate_overall_summary(emails):
     
     return " ".join(summary_parts)
 
-def main():
-    data_path = '/root/.openclaw/workspace/email-dashboard/data.json'
-    
-    print(f"Reading emails from {data_path}...")
-    with open(data_path, 'r') as f:
-        data = json.load(f)
-    
+def add_summaries(data):
+    """Add an ai_summary to every email in dashboard data, plus the overall summary"""
     emails = data.get('emails', [])
-    print(f"Found {len(emails)} emails to summarize.")
-    
-    if not emails:
-        print("No emails found.")
-        return
     
     # Generate AI summaries for each email
     print("\nGenerating summaries...")
@@ -106,6 +96,23 @@ def main():
         'overall_summary': overall,
         'total_emails': len(emails)
     }
+    return data
+
+def main():
+    data_path = '/root/.openclaw/workspace/email-dashboard/data.json'
+    
+    print(f"Reading emails from {data_path}...")
+    with open(data_path, 'r') as f:
+        data = json.load(f)
+    
+    emails = data.get('emails', [])
+    print(f"Found {len(emails)} emails to summarize.")
+    
+    if not emails:
+        print("No emails found.")
+        return
+    
+    add_summaries(data)
     
     # Write back
     with open(data_path, 'w') as f:
@@ -11,6 +11,8 @@ import re
 import json
 import subprocess
 
+from mail_fetch import DEFAULT_CHUNK_SIZE, uid_search, fetch_raw_messages
+
 def get_email_config():
     """Read email credentials from config"""
     with open('/root/.openclaw/workspace/.email_config', 'r') as f:
@@ -24,8 +26,8 @@ def get_email_config():
                 app_pass = line.split('=')[1].strip().strip('"')
         return email_addr, app_pass
 
-def fetch_todays_emails():
-    """Fetch all emails from today"""
+def fetch_todays_emails(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Fetch all emails from today using batched UID FETCH"""
     try:
         email_addr, app_pass = get_email_config()
         mail = imaplib.IMAP4_SSL('imap.gmail.com', 993)
@@ -34,18 +36,16 @@ def fetch_todays_emails():
         
         # Get today's date
         today = datetime.now().strftime('%d-%b-%Y')
-        status, messages = mail.search(None, f'(ON "{today}")')
+        email_ids = uid_search(mail, f'(ON "{today}")')
+        raw_messages = fetch_raw_messages(mail, email_ids, chunk_size)
         
         emails = []
-        if status == 'OK' and messages[0]:
-            email_ids = messages[0].split()
-            
+        if email_ids:
             for email_id in reversed(email_ids):
-                status, msg_data = mail.fetch(email_id, '(RFC822)')
-                if status != 'OK':
+                if email_id not in raw_messages:
                     continue
                 
-                raw_email = msg_data[0][1]
+                raw_email = raw_messages[email_id]
                 msg = email.message_from_bytes(raw_email)
                 
                 subject = ""
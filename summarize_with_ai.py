@@ -4,56 +4,160 @@ Email Summarization Script using LLM
 
 This script reads emails from data.json, generates AI summaries for each email,
 and creates an overall summary of all emails using the Kimi API.
+
+Emails are summarized concurrently (--concurrency requests in flight),
+paced by a token bucket (--rate requests per second) and with a per-request
+--timeout; summaries are written back in the original order. Point
+$KIMI_API_URL at mock_llm_server.py to try it offline.
+
+Summaries are cached on disk by a hash of the model, prompt template and
+email content (see summary_cache.py), so emails already summarized by a
+previous build are not sent again.
+
+--batch packs as many emails as fit a token budget (--batch-tokens) into
+one request asking for a JSON object of summaries by email ID, which cuts
+the number of round trips by roughly the batch size; emails missing from a
+reply are retried in a smaller follow-up batch.
+
+The overall summary covers every email: past --chunk-size emails it is
+built map-reduce style from cached chunk summaries (see
+generate_overall_summary), so its cost grows with the amount of new mail,
+not the size of the inbox.
+
+Requests go through one pooled llm_client.LlmClient (keep-alive, backoff
+with jitter, circuit breaker). When the API is unavailable an email gets the
+rule-based summary from summarize.py instead of an error message.
 """
 
+import argparse
 import json
 import os
 import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import requests
+
+from llm_client import LlmClient
+from summary_cache import SummaryCache, summary_key, DEFAULT_TTL
+import summarize
 
 # API Configuration
 KIMI_API_KEY = "sk-kimi-UeQQDSmk1jXIa28ZAmWdTcp3e5sfisBGLh2KjHDhOvdl8CW2oeKyxTl9gMbriDsP"
-KIMI_API_URL = "https://api.kimi.com/coding/v1/messages"
+KIMI_API_URL = os.environ.get('KIMI_API_URL', "https://api.kimi.com/coding/v1/messages")
+KIMI_MODEL = "k2p5"
+
+EMAIL_PROMPT = """Summarize this email in 1-2 sentences. What is it about? What action is needed if any?
+
+Subject: {subject}
+From: {sender}
+Body: {body}
+
+Summary:"""
+
+BATCH_PROMPT = """Summarize each of these emails in 1-2 sentences: what is it about, and what action is needed if any?
+
+Reply with only a JSON object mapping each email's ID (a string) to its summary, e.g. {{"3": "...", "7": "..."}}.
+
+{email_text}
+
+JSON:"""
+
+BATCH_EMAIL = """ID: {id}
+Subject: {subject}
+From: {sender}
+Body: {body}
+---"""
+
+CHUNK_PROMPT = """Summarize the main themes, urgent items and needed actions in these email notes in 2-3 sentences:
+
+{overview_text}
+
+Summary:"""
+
+OVERALL_PROMPT = """You are an email assistant. Write a concise paragraph (3-5 sentences) summarizing the overall themes and important items from these emails:
+
+{overview_text}
+
+Overall Summary:"""
 
+# Concurrent mode defaults: requests in flight, requests per second, seconds per request
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 2.0
+DEFAULT_TIMEOUT = 60
+# Batched mode: prompt tokens per request, reply tokens allowed per email, and
+# rounds of re-asking for emails a reply left out before summarizing them one by one
+DEFAULT_BATCH_TOKENS = 4000
+REPLY_TOKENS_PER_EMAIL = 80
+MAX_BATCH_ROUNDS = 3
+# Overall summary: notes per map-reduce chunk on average (at most twice that)
+DEFAULT_OVERVIEW_CHUNK = 20
 
-def call_llm(prompt: str) -> str:
+_client = None
+_client_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second, in bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_llm_client() -> LlmClient:
+    """
+    The shared Kimi client, created on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LlmClient(KIMI_API_URL, KIMI_API_KEY, KIMI_MODEL, headers={"User-Agent": "Kimi Claw Plugin"})
+        return _client
+
+
+def call_llm(prompt: str, timeout: float = 120, limiter: TokenBucket = None, fallback=None,
+             max_tokens: int = None) -> str:
     """
     Call the Kimi LLM API to generate a summary.
+
+    With a limiter, every attempt waits for a token first. If the API is
+    unavailable, returns fallback() when given, else raises llm_client.LlmUnavailable.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {KIMI_API_KEY}",
-        "User-Agent": "Kimi Claw Plugin"
-    }
-    
-    payload = {
-        "model": "k2p5",
-        "max_tokens": 512,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
-    
-    response = requests.post(KIMI_API_URL, headers=headers, json=payload, timeout=120)
-    response.raise_for_status()
-    data = response.json()
-    
-    # Extract the response content
-    if "content" in data and len(data["content"]) > 0:
-        return data["content"][0]["text"].strip()
-    elif "message" in data and "content" in data["message"]:
-        return data["message"]["content"].strip()
-    else:
-        raise RuntimeError(f"Unexpected response format: {data}")
+    return get_llm_client().complete(prompt, timeout, limiter, fallback, max_tokens)
 
 
-def summarize_email(email: dict) -> str:
+def estimate_tokens(text: str) -> int:
     """
-    Generate a 1-2 sentence summary of a single email.
+    Rough token count (about 4 characters per token for English text).
+    """
+    return len(text) // 4 + 1
+
+
+def _email_fields(email: dict) -> tuple:
+    """
+    (subject, sender, body) of an email as they go into a prompt.
     """
     subject = email.get('subject', 'No Subject')
     sender = email.get('from', 'Unknown Sender')
@@ -63,26 +167,250 @@ def summarize_email(email: dict) -> str:
     body = body.replace('\\r', ' ').replace('\\n', ' ').replace('\r', ' ').replace('\n', ' ').strip()
     if len(body) > 800:
         body = body[:800] + '...'
+    return subject, sender, body
+
+
+def summarize_email(email: dict, timeout: float = 120, limiter: TokenBucket = None,
+                    cache: SummaryCache = None, alias_key: str = None) -> str:
+    """
+    Generate a 1-2 sentence summary of a single email.
+
+    With a cache, a summary of identical content is reused, and is also
+    stored under alias_key if given. Rule-based fallback summaries are not
+    cached, so the next build asks the LLM again.
+    """
+    subject, sender, body = _email_fields(email)
+    
+    key = summary_key(KIMI_MODEL, EMAIL_PROMPT, subject, sender, body)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if alias_key:
+                cache.put(alias_key, cached)
+            return cached
     
-    prompt = f"""Summarize this email in 1-2 sentences. What is it about? What action is needed if any?
+    prompt = EMAIL_PROMPT.format(subject=subject, sender=sender, body=body)
+    fell_back = []
+    
+    def fallback():
+        fell_back.append(True)
+        return summarize.summarize_with_llm(body, subject, sender)
+    
+    try:
+        summary = call_llm(prompt, timeout, limiter, fallback)
+    except Exception as e:
+        print(f"    [Error: {str(e)[:50]}]")
+        return fallback()
+    if cache is not None and not fell_back:
+        cache.put(key, summary)
+        if alias_key:
+            cache.put(alias_key, summary)
+    return summary
 
-Subject: {subject}
-From: {sender}
-Body: {body}
 
-Summary:"""
+def summarize_emails(emails: list, concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                     timeout: float = DEFAULT_TIMEOUT, cache: SummaryCache = None, alias_keys: list = None) -> list:
+    """
+    Summarize emails with up to `concurrency` requests in flight, at most `rate` per second.
+
+    Returns the summaries in the same order as `emails`, whatever order the
+    requests finish in. A rate of 0 disables the limiter. alias_keys (one
+    per email) are extra cache keys for each summary; see summarize_email.
+    """
+    limiter = TokenBucket(rate, concurrency) if rate else None
+    summaries = [None] * len(emails)
+    alias_keys = alias_keys or [None] * len(emails)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(summarize_email, email, timeout, limiter, cache, alias_key): i
+                   for i, (email, alias_key) in enumerate(zip(emails, alias_keys))}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            summaries[i] = future.result()
+            subject_short = emails[i].get('subject', 'No Subject')[:45]
+            print(f"  [{done}/{len(emails)}] {subject_short}... ✓", flush=True)
+    return summaries
+
+
+def pack_batches(entries: list, budget: int = DEFAULT_BATCH_TOKENS) -> list:
+    """
+    Split formatted email entries into consecutive batches whose prompts fit `budget` tokens.
+
+    Returns lists of indices into `entries`. An entry too large for the
+    budget on its own still gets a batch of its own.
+    """
+    overhead = estimate_tokens(BATCH_PROMPT)
+    batches = []
+    current, used = [], overhead
+    for i, entry in enumerate(entries):
+        cost = estimate_tokens(entry)
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], overhead
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_reply(reply: str, ids: list) -> dict:
+    """
+    {id: summary} for the requested IDs found in a JSON batch reply; anything else is ignored.
+    """
+    start, end = reply.find('{'), reply.rfind('}')
+    if start == -1 or end < start:
+        return {}
+    try:
+        parsed = json.loads(reply[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    results = {}
+    for email_id in ids:
+        summary = parsed.get(email_id)
+        if isinstance(summary, str) and summary.strip():
+            results[email_id] = summary.strip()
+    return results
+
+
+def summarize_batch(entries: dict, timeout: float = 120, limiter: TokenBucket = None) -> dict:
+    """
+    Summarize {id: formatted entry} in one request; returns {id: summary} for the IDs the reply covered.
+    """
+    prompt = BATCH_PROMPT.format(email_text="\n".join(entries.values()))
+    reply = call_llm(prompt, timeout, limiter, max_tokens=REPLY_TOKENS_PER_EMAIL * len(entries) + 100)
+    return parse_batch_reply(reply, list(entries))
+
+
+def summarize_emails_batched(emails: list, budget: int = DEFAULT_BATCH_TOKENS,
+                             concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                             timeout: float = DEFAULT_TIMEOUT, cache: SummaryCache = None) -> list:
+    """
+    Summarize emails in batches of up to `budget` prompt tokens, in the order of `emails`.
+
+    Emails a reply leaves out (or garbles) are packed into new batches, up
+    to MAX_BATCH_ROUNDS rounds; any still missing, or in a batch whose
+    request failed, go through summarize_email one at a time.
+    """
+    limiter = TokenBucket(rate, concurrency) if rate else None
+    summaries = [None] * len(emails)
+    keys = {}
+    pending = []
+    for i, email in enumerate(emails):
+        subject, sender, body = _email_fields(email)
+        keys[i] = summary_key(KIMI_MODEL, BATCH_PROMPT, subject, sender, body)
+        cached = cache.get(keys[i]) if cache is not None else None
+        if cached is not None:
+            summaries[i] = cached
+        else:
+            pending.append(i)
+    
+    entries = {i: BATCH_EMAIL.format(id=i, subject=subject, sender=sender, body=body)
+               for i, (subject, sender, body) in ((i, _email_fields(emails[i])) for i in pending)}
+    failed = []
+    for round_number in range(1, MAX_BATCH_ROUNDS + 1):
+        if not pending:
+            break
+        batches = [[pending[j] for j in batch] for batch in pack_batches([entries[i] for i in pending], budget)]
+        print(f"  Round {round_number}: {len(pending)} emails in {len(batches)} requests", flush=True)
+        missing = []
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {executor.submit(summarize_batch, {str(i): entries[i] for i in batch}, timeout, limiter): batch
+                       for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"    [Error: {str(e)[:50]}]")
+                    failed.extend(batch)
+                    continue
+                for i in batch:
+                    if str(i) in results:
+                        summaries[i] = results[str(i)]
+                        if cache is not None:
+                            cache.put(keys[i], summaries[i])
+                    else:
+                        missing.append(i)
+        pending = sorted(missing)
+    
+    leftovers = sorted(failed + pending)
+    if leftovers:
+        print(f"  Summarizing {len(leftovers)} remaining emails one at a time", flush=True)
+        # Also cached under their batch keys, so the next batched run finds them
+        for i, summary in zip(leftovers, summarize_emails([emails[i] for i in leftovers], concurrency, rate,
+                                                           timeout, cache, [keys[i] for i in leftovers])):
+            summaries[i] = summary
+    return summaries
+
+
+def chunk_overviews(lines: list, chunk_size: int = DEFAULT_OVERVIEW_CHUNK) -> list:
+    """
+    Split lines into consecutive chunks (lists of indices) with content-defined boundaries.
+
+    A chunk ends after a line whose hash is 0 modulo chunk_size (or at twice
+    chunk_size lines), so adding or removing a line only changes the chunk
+    it falls in; every other chunk, and its cached summary, stays the same.
+    chunk_size must be at least 2, or chunks could never merge lines.
+    """
+    if chunk_size < 2:
+        raise ValueError(f"chunk_size must be at least 2, got {chunk_size}")
+    chunks, current = [], []
+    for i, line in enumerate(lines):
+        current.append(i)
+        if len(current) >= 2 * chunk_size or zlib.crc32(line.encode('utf-8', 'surrogatepass')) % chunk_size == 0:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    if len(chunks) == len(lines) > 1:
+        # Every line ended a chunk: fall back to fixed-size chunks so each level still shrinks
+        chunks = [list(range(i, min(i + chunk_size, len(lines)))) for i in range(0, len(lines), chunk_size)]
+    return chunks
+
+
+def _summarize_node(template: str, lines: list, fallback, timeout: float, limiter: TokenBucket = None,
+                    cache: SummaryCache = None) -> str:
+    """
+    One LLM call over overview lines, cached by the set of lines; fallback() is used (uncached) on failure.
+    """
+    key = summary_key(KIMI_MODEL, template, *sorted(lines))
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
+    prompt = template.format(overview_text="\n".join(lines))
+    fell_back = []
+    
+    def node_fallback():
+        fell_back.append(True)
+        return fallback()
     
     try:
-        summary = call_llm(prompt)
-        return summary
+        summary = call_llm(prompt, timeout, limiter, node_fallback)
     except Exception as e:
         print(f"    [Error: {str(e)[:50]}]")
-        return f"[Error generating summary: {str(e)[:100]}]"
+        return node_fallback()
+    if cache is not None and not fell_back:
+        cache.put(key, summary)
+        if alias_key:
+            cache.put(alias_key, summary)
+    return summary
 
 
-def generate_overall_summary(emails: list, email_summaries: list) -> str:
+def generate_overall_summary(emails: list, email_summaries: list, timeout: float = 120,
+                             cache: SummaryCache = None, chunk_size: int = DEFAULT_OVERVIEW_CHUNK,
+                             concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE) -> str:
     """
     Generate an overall summary paragraph of all emails.
+
+    Emails that fit in one chunk (see chunk_overviews) are summarized in one call. Beyond that the
+    overview lines are summarized map-reduce style: chunks of lines are
+    summarized in parallel, then chunks of those summaries, until one prompt
+    covers everything. Every node is cached by its inputs, so when new mail
+    arrives only the chunks it lands in and their ancestors are recomputed.
     """
     # Create a condensed view of all emails with their summaries
     email_overviews = []
@@ -92,26 +420,53 @@ def generate_overall_summary(emails: list, email_summaries: list) -> str:
         summary_short = summary[:100] if len(summary) > 100 else summary
         email_overviews.append(f"- {sender}: {subject} - {summary_short}")
     
-    overview_text = "\n".join(email_overviews[:20])
+    limiter = TokenBucket(rate, concurrency) if rate else None
+    # Each line of the current level and the emails it covers (for rule-based fallbacks)
+    lines = email_overviews
+    covers = [[i] for i in range(len(emails))]
+    level = 0
+    while len(lines) > chunk_size:
+        chunks = chunk_overviews(lines, chunk_size)
+        if len(chunks) == 1:
+            # The lines fit one chunk anyway; summarizing it first would only add a call
+            break
+        level += 1
+        print(f"  Level {level}: {len(lines)} notes in {len(chunks)} chunks", flush=True)
+        chunk_covers = [[i for j in chunk for i in covers[j]] for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [
+                executor.submit(_summarize_node, CHUNK_PROMPT, [lines[j] for j in chunk],
+                                lambda covered=covered: summarize.generate_overall_summary([emails[i] for i in covered]),
+                                timeout, limiter, cache)
+                for chunk, covered in zip(chunks, chunk_covers)
+            ]
+            lines = [f"- {future.result()}" for future in futures]
+        covers = chunk_covers
     
-    prompt = f"""You are an email assistant. Write a concise paragraph (3-5 sentences) summarizing the overall themes and important items from these emails:
-
-{overview_text}
-
-Overall Summary:"""
-    
-    try:
-        summary = call_llm(prompt)
-        return summary
-    except Exception as e:
-        print(f"    [Error: {str(e)[:50]}]")
-        return f"[Error generating overall summary: {str(e)[:100]}]"
+    return _summarize_node(OVERALL_PROMPT, lines, lambda: summarize.generate_overall_summary(emails),
+                           timeout, limiter, cache)
 
 
 def main():
     """
     Main function to process emails and generate summaries.
     """
+    parser = argparse.ArgumentParser(description="Add LLM summaries to data.json")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help="requests in flight at once (1 = one email at a time)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="max requests per second (0 = unlimited)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="seconds before a request is abandoned")
+    parser.add_argument('--batch', action='store_true', help="pack several emails into each request")
+    parser.add_argument('--batch-tokens', type=int, default=DEFAULT_BATCH_TOKENS,
+                        help="prompt token budget per batched request")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_OVERVIEW_CHUNK,
+                        help="emails per chunk of the hierarchical overall summary (at least 2)")
+    parser.add_argument('--no-cache', action='store_true', help="summarize every email again, ignoring the summary cache")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL, help="seconds a cached summary stays valid")
+    args = parser.parse_args()
+    if args.chunk_size < 2:
+        parser.error("--chunk-size must be at least 2")
+    
     data_path = '/root/.openclaw/workspace/email-dashboard/data.json'
     
     # Read the email data
@@ -126,21 +481,36 @@ def main():
         print("No emails found. Exiting.")
         return
     
-    # Generate summaries for each email
-    print("Generating AI summaries for each email...")
-    email_summaries = []
+    cache = None if args.no_cache else SummaryCache(ttl=args.cache_ttl)
     
-    for i, email in enumerate(emails):
-        subject_short = email.get('subject', 'No Subject')[:45]
-        print(f"  [{i+1}/{len(emails)}] {subject_short}...", end=" ", flush=True)
-        summary = summarize_email(email)
+    # Generate summaries for each email
+    start = time.perf_counter()
+    if args.batch:
+        print(f"Generating AI summaries in batches of up to {args.batch_tokens} tokens...")
+        email_summaries = summarize_emails_batched(emails, args.batch_tokens, args.concurrency, args.rate,
+                                                   args.timeout, cache)
+    else:
+        print(f"Generating AI summaries for each email ({args.concurrency} at a time)...")
+        email_summaries = summarize_emails(emails, args.concurrency, args.rate, args.timeout, cache)
+    for email, summary in zip(emails, email_summaries):
         email['ai_summary'] = summary
-        email_summaries.append(summary)
-        print(f"✓")
+    print(f"Summarized {len(emails)} emails in {time.perf_counter() - start:.1f}s")
     
     # Generate overall summary
     print("\nGenerating overall summary...")
-    overall_summary = generate_overall_summary(emails, email_summaries)
+    overall_summary = generate_overall_summary(emails, email_summaries, args.timeout, cache, args.chunk_size,
+                                               args.concurrency, args.rate)
+    
+    if cache is not None:
+        print(f"Summary cache: {cache.hits} hits, {cache.misses} misses")
+        cache.evict()
+        cache.close()
+    
+    llm_stats = get_llm_client().stats()
+    latency = llm_stats.get('latency', {})
+    print(f"LLM calls: {llm_stats['calls']} ({llm_stats['retries']} retries, {llm_stats['failures']} failed, "
+          f"{llm_stats['fallbacks']} rule-based fallbacks), circuit {llm_stats['circuit']}, "
+          f"latency p50 {latency.get('p50', 0)}s p95 {latency.get('p95', 0)}s")
     
     # Update the data structure
     data['ai_summary'] = {
@@ -148,6 +518,9 @@ def main():
         'generated_at': datetime.now().isoformat(),
         'total_emails_summarized': len(emails)
     }
+    if cache is not None:
+        data['ai_summary']['cache'] = {'hits': cache.hits, 'misses': cache.misses}
+    data['ai_summary']['llm'] = llm_stats
     
     # Write the updated data back
     print(f"\nWriting updated data to {data_path}...")
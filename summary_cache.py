@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Summary cache - Persists LLM summaries by content hash
+
+A summary is keyed on a hash of everything that went into its prompt (the
+model, the prompt template and the email's subject, sender and body), so an
+email that is still in the inbox on the next build is not sent to the API
+again, while a new model or template misses automatically. Entries expire
+after a TTL (a summary is not worth keeping forever) and the file is trimmed
+to the most recently used entries.
+
+Lookups go through an in-memory LRU first and the SQLite file second.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SUMMARY_CACHE_PATH = '/root/.openclaw/workspace/email-dashboard/.summary_cache.db'
+
+DEFAULT_TTL = 7 * 86400
+DEFAULT_MEMORY_ENTRIES = 1000
+DEFAULT_DISK_ENTRIES = 20000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS summaries (
+    key TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used);
+'''
+
+
+def summary_key(*parts):
+    """Content hash of the strings that determine a summary"""
+    return hashlib.sha256('\0'.join(parts).encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class SummaryCache:
+    """TTL + LRU cache of summaries, optionally backed by SQLite; safe to share between threads"""
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MEMORY_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self.conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute('DELETE FROM summaries WHERE created < ?', (time.time() - ttl,))
+            self.conn.commit()
+
+    def _remember(self, key, summary, created):
+        self.memory[key] = (summary, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached summary for `key`, or None if missing or expired"""
+        with self.lock:
+            now = time.time()
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            elif self.conn is not None:
+                row = self.conn.execute('SELECT summary, created FROM summaries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    entry = tuple(row)
+                    self._remember(key, *entry)
+            if entry is None or entry[1] < now - self.ttl:
+                if entry is not None:
+                    self.memory.pop(key, None)
+                    if self.conn is not None:
+                        self.conn.execute('DELETE FROM summaries WHERE key = ?', (key,))
+                        self.conn.commit()
+                self.misses += 1
+                return None
+            if self.conn is not None:
+                self.conn.execute('UPDATE summaries SET last_used = ? WHERE key = ?', (now, key))
+                self.conn.commit()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, summary):
+        with self.lock:
+            now = time.time()
+            self._remember(key, summary, now)
+            if self.conn is not None:
+                self.conn.execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)', (key, summary, now, now))
+                self.conn.commit()
+
+    def evict(self, max_count=DEFAULT_DISK_ENTRIES):
+        """Drop expired rows and keep at most `max_count` of the most recently used ones on disk"""
+        with self.lock:
+            if self.conn is None:
+                return 0
+            removed = self.conn.execute('DELETE FROM summaries WHERE created < ?', (time.time() - self.ttl,)).rowcount
+            removed += self.conn.execute(
+                'DELETE FROM summaries WHERE key NOT IN (SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)',
+                (max_count,),
+            ).rowcount
+            self.conn.commit()
+            return removed
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Incremental sync state - Persists UIDVALIDITY and the high-water UID per mailbox
+"""
+
+import json
+
+from atomic_io import atomic_write
+
+SYNC_STATE_PATH = '/root/.openclaw/workspace/email-dashboard/.sync_state.json'
+
+
+def load_sync_state(path=SYNC_STATE_PATH):
+    """Load {mailbox: {'uidvalidity': str, 'last_uid': int}} or {} if missing/corrupt"""
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sync_state(state, path=SYNC_STATE_PATH):
+    """Write the sync state atomically so a crash never leaves a truncated file"""
+    atomic_write(path, json.dumps(state, indent=2).encode())
+
+
+def resume_uid(mailbox_state, uidvalidity):
+    """Return the last seen UID to resume after, or None if a full resync is needed"""
+    if not mailbox_state or mailbox_state.get('uidvalidity') != uidvalidity:
+        return None
+    return mailbox_state.get('last_uid') or None
+
+
+def advance(mailbox_state, uidvalidity, uids):
+    """Record the mailbox's UIDVALIDITY and move the high-water mark past `uids`"""
+    if mailbox_state.get('uidvalidity') != uidvalidity:
+        mailbox_state['last_uid'] = 0
+    mailbox_state['uidvalidity'] = uidvalidity
+    if uids:
+        mailbox_state['last_uid'] = max(mailbox_state.get('last_uid', 0), max(int(uid) for uid in uids))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Task dedup - Clusters near-duplicate tasks across messages with MinHash/LSH
+
+The same task tends to show up many times with small edits: quoted in
+threaded replies, repeated by reminder emails, re-worded in a forward.
+Each task is reduced to a set of character shingles and a MinHash
+signature; signatures are split into bands and hashed into buckets
+(locality-sensitive hashing), so only tasks sharing a bucket are compared.
+Each task is compared, by exact Jaccard similarity, only with the
+representatives of clusters it shares a bucket with, at most
+MAX_BUCKET_CANDIDATES per bucket, so the pass stays linear in the number
+of tasks. Tasks whose numbers differ (invoice numbers, dates, amounts)
+are never merged.
+
+NumPy is optional and only speeds up signature computation.
+"""
+
+import random
+import re
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 32
+# 8 bands x 4 rows: pairs above ~0.6 Jaccard almost always share a bucket
+NUM_BANDS = 8
+# A one-word substitution in a short task scores ~0.7; an added word or prefix ~0.8+
+DEFAULT_THRESHOLD = 0.75
+# Most recently used cluster representatives compared per bucket
+MAX_BUCKET_CANDIDATES = 8
+
+# Universal hashing (a * x + b) mod a 31-bit prime, so products fit in 64 bits with NumPy
+_PRIME = (1 << 31) - 1
+_rng = random.Random(0x7A5C)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def shingles(task):
+    """Set of hashed character shingles of the normalized task text"""
+    text = _WHITESPACE_RE.sub(' ', _NON_WORD_RE.sub('', task.lower())).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode())}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _signatures(shingle_sets):
+    """MinHash signature (one min per permutation) of every shingle set"""
+    if np is None:
+        return [tuple(min((a * (x % _PRIME) + b) % _PRIME for x in hashes) for a, b in _PERMUTATIONS)
+                for hashes in shingle_sets]
+    # All shingles of all tasks at once; reduceat takes the per-task minimum
+    prime = np.uint64(_PRIME)
+    a = np.array([a for a, _ in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    b = np.array([b for _, b in _PERMUTATIONS], dtype=np.uint64)[:, None]
+    lengths = np.fromiter(map(len, shingle_sets), dtype=np.int64, count=len(shingle_sets))
+    values = np.fromiter((x for hashes in shingle_sets for x in hashes), dtype=np.uint64,
+                         count=int(lengths.sum())) % prime
+    hashed = (a * values[None, :] + b) % prime
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return [tuple(row) for row in np.minimum.reduceat(hashed, offsets, axis=1).T.tolist()]
+
+
+def _numbers(task):
+    """The task's numeric tokens (invoice numbers, amounts, dates), which must match for a merge"""
+    return frozenset(_NUMBER_RE.findall(task))
+
+
+def cluster_tasks(tasks, threshold=DEFAULT_THRESHOLD):
+    """Group near-duplicate tasks; returns lists of indices into `tasks`, each sorted, ordered by first index
+
+    Tasks are taken in order and each joins the most similar cluster found
+    through its LSH buckets, judged against that cluster's representative
+    (its first task, whose text is kept), or starts a new one. Clusters are
+    never merged with each other, so a chain of slightly different tasks
+    can't drift into one cluster.
+    """
+    if not tasks:
+        return []
+    shingle_sets = [shingles(task) for task in tasks]
+    numbers = [_numbers(task) for task in tasks]
+    signatures = _signatures(shingle_sets)
+
+    rows = NUM_PERMUTATIONS // NUM_BANDS
+    # (band, band signature) -> the MAX_BUCKET_CANDIDATES most recently used representatives there, newest last
+    buckets = {}
+    clusters = {}
+    for i, signature in enumerate(signatures):
+        keys = [(band, signature[band * rows:(band + 1) * rows]) for band in range(NUM_BANDS)]
+        candidates = dict.fromkeys(rep for key in keys for rep in buckets.get(key, ()))
+        best, best_score = None, threshold
+        a = shingle_sets[i]
+        for rep in candidates:
+            if numbers[rep] != numbers[i]:
+                continue
+            b = shingle_sets[rep]
+            score = len(a & b) / len(a | b)
+            if score >= best_score:
+                best, best_score = rep, score
+        if best is None:
+            best = i
+            clusters[i] = []
+        clusters[best].append(i)
+        for key in keys:
+            reps = buckets.setdefault(key, [])
+            if best in reps:
+                reps.remove(best)
+            reps.append(best)
+            if len(reps) > MAX_BUCKET_CANDIDATES:
+                del reps[0]
+    return list(clusters.values())
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Task extraction - Pulls actionable tasks out of email text
+
+Sentences are matched against a priority-ordered list of trigger patterns,
+compiled into a single alternation so each sentence is scanned once; the
+winning pattern's capture then builds the task text.
+"""
+
+import re
+
+# Task patterns in priority order: (name, trigger, capture). A sentence
+# yields at most one task, from the first pattern whose trigger matches
+# anywhere in it; the capture pattern then pulls out the task text.
+_TASK_VERBS = r'review|approve|sign|submit|send|complete|update|check|confirm|read|look at'
+_TASK_DAYS = r'Monday|Tuesday|Wednesday|Thursday|Friday|tomorrow|today'
+_TASK_DOCS = r'document|file|report|proposal|invoice|contract|agreement'
+_TASK_PATTERNS = [
+    ('request', rf'\b(?:please|kindly)\s+(?:{_TASK_VERBS})\b',
+     rf'(?:please|kindly)\s+({_TASK_VERBS})\s+(.+)'),
+    ('need', r'\b(?:we need to|you need to|i need you to|need to)\s+',
+     r'(?:we need to|you need to|i need you to|need to)\s+(.+)'),
+    ('reminder', r'\b(?:don\'t forget to|remember to|make sure to)\s+',
+     r'(?:don\'t forget to|remember to|make sure to)\s+(.+)'),
+    ('action_item', r'\baction item\b',
+     r'action item[s]?:?\s*(.+)'),
+    ('schedule', r'\b(?:schedule|book|arrange|set up)\s+(?:a\s+)?(?:meeting|call|sync|discussion|demo|review)\b',
+     r'(schedule|book|arrange|set up)\s+(?:a\s+)?(meeting|call|sync|discussion|demo|review)\s*(?:with\s+)?(.+)?'),
+    ('deadline', rf'\b(?:due|deadline|by|before)\s+(?:{_TASK_DAYS}|\d{{1,2}})',
+     rf'(.+?)\s+(?:is\s+)?(?:due|deadline|by|before)\s+({_TASK_DAYS}|\d{{1,2}}[^\.\n]*)'),
+    ('reply', r'\b(?:awaiting|waiting for|looking forward to)\s+(?:your\s+)?(?:reply|response|feedback|input)',
+     None),
+    ('attachment', r'\b(?:attached|find attached|see attached|please find|enclosed)\b',
+     rf'(?:attached|enclosed)[^\.\n]*({_TASK_DOCS})[^\.\n]*'),
+]
+
+def _leading_letters(trigger):
+    """First letters a trigger can start with; triggers are \\b plus a word or a (?:word|...) group"""
+    body = trigger[2:]
+    words = body[len('(?:'):body.index(')')].split('|') if body.startswith('(?:') else [body]
+    return {word[0].lower() for word in words}
+
+_TASK_ORDER = [name for name, _, _ in _TASK_PATTERNS]
+_TASK_TRIGGERS = {name: re.compile(trigger, re.IGNORECASE) for name, trigger, _ in _TASK_PATTERNS}
+_TASK_CAPTURES = {name: re.compile(capture, re.IGNORECASE) for name, _, capture in _TASK_PATTERNS if capture}
+# All triggers in one alternation, with the shared leading \b and a first-letter
+# lookahead hoisted out so most positions are rejected before any alternative runs
+_TASK_LETTERS = ''.join(sorted(set().union(*(_leading_letters(t) for _, t, _ in _TASK_PATTERNS))))
+_TASK_TRIGGER_ANY = re.compile(
+    rf'\b(?=[{_TASK_LETTERS}])(?:' + '|'.join(
+        f'(?P<{name}>{trigger[2:]})' for name, trigger, _ in _TASK_PATTERNS) + ')',
+    re.IGNORECASE)
+# The attachment pattern also needs a document word somewhere in the sentence
+_TASK_ATTACHMENT_DOC = re.compile(rf'\b(?:{_TASK_DOCS})\b', re.IGNORECASE)
+
+_URL_RE = re.compile(r'http[s]?://\S+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_TRAILING_PUNCT_RE = re.compile(r'[,;:]+$')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+def _match_task_pattern(sent):
+    """Return the name of the highest-priority pattern triggered by the sentence, or None
+    
+    The combined search finds the leftmost trigger; at that position every
+    earlier alternative has already failed, so a higher-priority pattern can
+    only match further right and is re-checked from there.
+    """
+    match = _TASK_TRIGGER_ANY.search(sent)
+    if not match:
+        return None
+    first = match.lastgroup
+    for name in _TASK_ORDER[:_TASK_ORDER.index(first)]:
+        if _TASK_TRIGGERS[name].search(sent, match.start() + 1):
+            return name
+    if first == 'attachment' and not _TASK_ATTACHMENT_DOC.search(sent):
+        return None
+    return first
+
+def _build_task(name, sent):
+    """Turn a triggered sentence into task text using the pattern's capture"""
+    if name == 'reply':
+        return "Reply to email"
+    match = _TASK_CAPTURES[name].search(sent)
+    if not match:
+        return None
+    if name == 'request':
+        return f"{match.group(1).capitalize()} {match.group(2)}"
+    if name == 'schedule':
+        with_whom = match.group(3) if match.group(3) else ""
+        return f"{match.group(1).capitalize()} {match.group(2)} {with_whom}".strip()
+    if name == 'deadline':
+        action = match.group(1).strip()
+        if len(action) > 10:
+            return f"{action} (Due {match.group(2)})"
+        return None
+    if name == 'attachment':
+        return f"Review attached {match.group(1)}"
+    return match.group(1).capitalize()
+
+def extract_tasks(body, subject=""):
+    """Extract actionable tasks from email body and subject"""
+    tasks = []
+    text = subject + " " + body
+    
+    # Clean up text
+    text = _URL_RE.sub('', text)
+    text = _WHITESPACE_RE.sub(' ', text)
+    
+    # Split into sentences for context
+    for sent in _SENTENCE_SPLIT_RE.split(text):
+        sent = sent.strip()
+        if len(sent) < 20 or len(sent) > 300:
+            continue
+        
+        name = _match_task_pattern(sent)
+        task = _build_task(name, sent) if name else None
+        
+        # Clean up and add task
+        if task:
+            task = _WHITESPACE_RE.sub(' ', task)
+            task = _TRAILING_PUNCT_RE.sub('', task)
+            task = task[0].upper() + task[1:] if task else task
+            
+            if len(task) > 15 and len(task) < 200:
+                tasks.append(task)
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_tasks = []
+    for task in tasks:
+        # Create a normalized version for comparison
+        normalized = _NON_WORD_RE.sub('', task.lower())
+        normalized = _WHITESPACE_RE.sub(' ', normalized).strip()
+        
+        if normalized not in seen and len(normalized) > 10:
+            seen.add(normalized)
+            unique_tasks.append(task)
+    
+    return unique_tasks[:10]
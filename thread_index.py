@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Thread index - Groups messages into conversations by Message-ID headers
+
+Every message id seen (a message's own Message-ID and the ids it refers
+to) maps to a thread id in one dict, so placing a message costs a few hash
+lookups however many threads there are. A thread's id is the Message-ID of
+its root when the References header names it, otherwise the oldest known
+ancestor. Thread metadata (subject, size, participants) is updated as
+messages are added.
+"""
+
+import re
+
+_MESSAGE_ID_RE = re.compile(r'<[^<>\s]+>')
+
+
+def parse_message_ids(value):
+    """All <message-id> tokens in a header value, in order"""
+    return _MESSAGE_ID_RE.findall(str(value)) if value else []
+
+
+def thread_refs(msg):
+    """[root, parent] ids a message refers to (deduplicated, possibly empty) from References/In-Reply-To"""
+    references = parse_message_ids(msg['References'])
+    in_reply_to = parse_message_ids(msg['In-Reply-To'])
+    parent = in_reply_to[-1] if in_reply_to else (references[-1] if references else None)
+    refs = [references[0]] if references else []
+    if parent and parent not in refs:
+        refs.append(parent)
+    return refs
+
+
+class ThreadIndex:
+    """Hash map from message id to thread id, plus per-thread metadata"""
+
+    def __init__(self):
+        self.thread_of = {}
+        self.threads = {}
+
+    def add(self, e):
+        """Place an email dict (oldest first works best) and set its 'thread_id'; returns the thread id"""
+        message_id = e.get('message_id') or f"{e.get('mailbox')}:{e['id']}"
+        refs = e.get('thread_refs') or []
+        thread_id = self.thread_of.get(message_id)
+        for ref in refs:
+            if thread_id is not None:
+                break
+            thread_id = self.thread_of.get(ref)
+        if thread_id is None:
+            thread_id = refs[0] if refs else message_id
+        for known in [message_id] + refs:
+            self.thread_of.setdefault(known, thread_id)
+
+        thread = self.threads.get(thread_id)
+        if thread is None:
+            thread = self.threads[thread_id] = {
+                'thread_id': thread_id,
+                'subject': e['subject'],
+                'count': 0,
+                'participants': []
+            }
+        thread['count'] += 1
+        if e['from'] not in thread['participants']:
+            thread['participants'].append(e['from'])
+        e['thread_id'] = thread_id
+        return thread_id
+
+    def thread(self, thread_id):
+        return self.threads.get(thread_id)
+
+
+def group_conversations(emails):
+    """Index `emails` (newest first) and return one conversation per thread, newest first
+
+    Each conversation is the thread metadata plus 'email_index', the position
+    of its newest message in `emails`, so a busy thread takes one slot in the
+    list instead of one per message.
+    """
+    index = ThreadIndex()
+    for e in reversed(emails):
+        index.add(e)
+    conversations = []
+    seen = set()
+    for position, e in enumerate(emails):
+        if e['thread_id'] in seen:
+            continue
+        seen.add(e['thread_id'])
+        conversations.append(dict(index.thread(e['thread_id']), email_index=position))
+    return conversations
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Time index - Dates parsed once into epoch seconds, and bisect range queries over them
+
+The decode stage stores each email's Date header as an integer 'timestamp'
+so nothing downstream (sorting, merging, rolling windows, the browser)
+parses RFC 2822 strings again. TimeIndex keeps emails sorted by timestamp
+and answers "last hour", "today" and "since X" with binary search.
+"""
+
+import bisect
+import calendar
+import email.utils
+import time
+from datetime import datetime
+
+
+def parse_timestamp(date_str):
+    """Epoch seconds for an RFC 2822 Date header, or None if it cannot be parsed (no timezone means UTC)"""
+    try:
+        parsed = email.utils.parsedate_tz(date_str)
+        # Not mktime_tz, which reads a zoneless date as local time
+        return calendar.timegm(parsed[:9]) - (parsed[9] or 0) if parsed else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def email_timestamp(e):
+    """An email's timestamp, parsing and storing it for records written before timestamps existed"""
+    if 'timestamp' not in e:
+        e['timestamp'] = parse_timestamp(e.get('date'))
+    return e['timestamp']
+
+
+class TimeIndex:
+    """Emails sorted by timestamp; undated mail is left out of every query"""
+
+    def __init__(self, emails=()):
+        self.timestamps = []
+        self.emails = []
+        for e in sorted((e for e in emails if email_timestamp(e) is not None), key=lambda e: e['timestamp']):
+            self.timestamps.append(e['timestamp'])
+            self.emails.append(e)
+
+    def between(self, start=None, end=None):
+        """Emails with start <= timestamp <= end, newest first"""
+        lo = 0 if start is None else bisect.bisect_left(self.timestamps, start)
+        hi = len(self.timestamps) if end is None else bisect.bisect_right(self.timestamps, end)
+        return self.emails[lo:hi][::-1]
+
+    def since(self, start):
+        return self.between(start)
+
+    def last(self, seconds, now=None):
+        return self.between((time.time() if now is None else now) - seconds)
+
+    def today(self, now=None):
+        """Emails since local midnight"""
+        midnight = datetime.fromtimestamp(time.time() if now is None else now).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        return self.between(int(midnight.timestamp()))
+
+    def __len__(self):
+        return len(self.timestamps)